@@ -1,487 +1,394 @@
 #To run the code. First, install the sympy by typing 'pip install sympy' on the terminal.
 #Make sure to have python.
+#The derivative logic lives in the chain_rule package; this file is only the Tk front-end.
+#Run with --startup-time to print cold-start timings as JSON and exit once warm.
 
+import time
+
+# Taken before the other imports so --startup-time covers them too.
+LAUNCHED_AT = time.perf_counter()
+
+import json
+import logging
+import os
+import sys
+import threading
 import tkinter as tk
 from tkinter import ttk, messagebox
-import sympy as sp
 
-total_chain_result = None
-result_boxes = []
+from chain_rule import instrument
+from chain_rule.accumulate import RunningSum
+from chain_rule.history import HistoryBuffer
+from chain_rule.worker import DerivativeWorker
+
+POLL_INTERVAL_MS = 50
+# Live preview waits for this much idle time after the last edit.
+PREVIEW_DELAY_MS = 250
+# A superseded live job is left to finish (its result is dropped) unless it
+# runs this long; killing the worker means paying for a fresh one's start-up.
+SUPERSEDED_GRACE_MS = 1000
+STARTUP_POLL_MS = 100
+# Results kept in memory; older ones are spilled to a temporary file.
+HISTORY_MEMORY_ENTRIES = int(os.environ.get("CHAIN_RULE_HISTORY_ENTRIES", "200"))
+HISTORY_VISIBLE_ROWS = 8
+# Expressions bigger than this (in nodes) are shown elided in the steps until
+# clicked, so a huge intermediate result can't freeze the window.
+STEPS_ELIDE_NODES = 2000
+MEASURE_STARTUP = "--startup-time" in sys.argv or bool(os.environ.get("CHAIN_RULE_STARTUP_TIME"))
+
+running_total = RunningSum()
+history = HistoryBuffer(HISTORY_MEMORY_ENTRIES)
+# Index of the history entry shown in the list's top row.
+history_top = 0
 focused_entry = None
-
-def validate_input(expression):
-    try:
-        expression = expression.replace('^', '**')
-        return sp.sympify(expression, locals={
-            "sin": sp.sin, "cos": sp.cos, "tan": sp.tan,
-            "exp": sp.exp, "log": sp.log, "sqrt": sp.sqrt
-        })
-    except (sp.SympifyError, SyntaxError):
-        raise ValueError("Invalid input! Use correct syntax: e.g., '2*x', 'x^2', or 'sin(u)'.")
-
-def chain_rule_calculator(inner_func, outer_func, variable):
-    x = sp.symbols(variable)
-    inner = validate_input(inner_func)
-    u = sp.Function('u')(x)
-
-    outer_expr = validate_input(outer_func.replace('u', str(u)))
-    inner_derivative = sp.diff(inner, x)
-
-    outer_func_clean = outer_func.replace(' ', '').lower()
-    manual = False
-
-    if outer_func_clean == "sin(u)":
-        outer_derivative = sp.cos(u)
-        manual = True
-        outer_rule_str = "cos(u)"
-    elif outer_func_clean == "cos(u)":
-        outer_derivative = -sp.sin(u)
-        manual = True
-        outer_rule_str = "-sin(u)"
-    elif outer_func_clean == "tan(u)":
-        outer_derivative = sp.sec(u)**2
-        manual = True
-        outer_rule_str = "sec(u)^2"
-    elif outer_func_clean == "cot(u)":
-        outer_derivative = -sp.csc(u)**2
-        manual = True
-        outer_rule_str = "-csc(u)^2"
-    elif outer_func_clean == "csc(u)":
-        outer_derivative = -sp.csc(u) * sp.cot(u)
-        manual = True
-        outer_rule_str = "-csc(u) cot(u)"
-    elif outer_func_clean == "sec(u)":
-        outer_derivative = sp.sec(u) * sp.tan(u)
-        manual = True
-        outer_rule_str = "sec(u) tan(u)"
-    elif '^' in outer_func_clean:
-        base, exponent = outer_func_clean.split('^')
-        if base == 'u' and exponent.isnumeric():
-            outer_derivative = int(exponent) * u**(int(exponent) - 1)
-            manual = True
-            outer_rule_str = f"{exponent}*u^{int(exponent) - 1}"
-    else:
-        outer_derivative = sp.diff(outer_expr, u)
-        outer_rule_str = str(outer_derivative)
-
-    substituted = outer_derivative.subs(u, inner)
-    result = substituted * inner_derivative
-
-    steps = (
-        f"Step-by-step solution (Chain Rule):\n\n"
-        f"1. Let g({x}) = {inner}\n"
-        f"2. Let f(u) = {outer_func}\n"
-        f"3. Compute g'({x}) = {inner_derivative}\n"
-        f"4. Compute f'(u) = {outer_rule_str}\n"
-        f"5. Substitute u = g({x}) into f'(u): f'(g({x})) = {substituted}\n"
-        f"6. Multiply by g'({x}): {substituted} * {inner_derivative}\n"
-        f"7. Simplify: {sp.simplify(result)}"
-    )
-    return sp.simplify(result), steps
-
-def quotient_rule_calculator(numerator, denominator, variable):
-    x = sp.symbols(variable)
-    num = validate_input(numerator)
-    denom = validate_input(denominator)
-    num_derivative = sp.diff(num, x)
-    denom_derivative = sp.diff(denom, x)
-    result = (num_derivative * denom - num * denom_derivative) / denom**2
-    steps = (
-        f"Step-by-step solution (Quotient Rule):\n\n"
-        f"1. Let u(x) = {num}, v(x) = {denom}\n"
-        f"2. Compute u'({x}) = {num_derivative}, v'({x}) = {denom_derivative}\n"
-        f"3. Apply the quotient rule:\n"
-        f"   (u' * v - u * v') / v^2 = ({num_derivative} * {denom} - {num} * {denom_derivative}) / ({denom})^2\n"
-        f"4. Simplify: {sp.simplify(result)}"
-    )
-    return sp.simplify(result), steps
+current_job = None
+# Whether current_job came from the live preview rather than Calculate.
+current_live = False
+job_started = 0.0
+polling = False
+preview_after = None
+# The inputs changed while a superseded job still held the worker.
+live_pending = False
+# Chain Rule result shown by the live preview but not yet in running_total;
+# Add Equation takes it in.
+uncommitted = None
+# The problem (see current_problem) current_job is solving, and the last one
+# Calculate added to running_total; a preview of that one adds nothing new.
+current_inputs = None
+committed_inputs = None
+# The running total current_job is simplifying for Add Equation, if it is
+# that kind of job.
+current_total = None
+worker = DerivativeWorker()
+sympy_ready = threading.Event()
+startup_times = {}
+
+def warm_up_sympy():
+    # Runs on a background thread so the window is up before sympy is loaded.
+    # Results arriving from the worker are unpickled into sympy objects here.
+    import sympy as sp
+    from chain_rule.parser import parse
+    x = sp.Symbol("x")
+    sp.diff(parse("sin(x)^2 + exp(x)/x"), x)
+    startup_times["gui_sympy_ready_ms"] = (time.perf_counter() - LAUNCHED_AT) * 1000
+    sympy_ready.set()
+
+def check_startup():
+    # The worker's ready message is normally read by poll_worker; while no job
+    # is running nothing else would read it.
+    if not worker.busy:
+        worker.poll()
+    if worker.ready and "worker_ready_ms" not in startup_times:
+        startup_times["worker_ready_ms"] = (time.perf_counter() - LAUNCHED_AT) * 1000
+    if not (worker.ready and sympy_ready.is_set()):
+        root.after(STARTUP_POLL_MS, check_startup)
+        return
+    if not worker.busy:
+        status_var.set("")
+    if MEASURE_STARTUP:
+        print(json.dumps({"event": "startup", **{k: round(v, 1) for k, v in startup_times.items()}}), flush=True)
+        if "--startup-time" in sys.argv:
+            on_close()
+
+def wait_for_worker():
+    # A cancelled, timed-out or crashed job leaves a fresh worker to start up;
+    # like check_startup, read its ready message while no job is running so
+    # the status clears.
+    worker.start()
+    if not worker.busy:
+        worker.poll()
+    if not worker.ready:
+        root.after(STARTUP_POLL_MS, wait_for_worker)
+    elif not worker.busy:
+        status_var.set(idle_status())
+
+def idle_status():
+    return "" if worker.ready and sympy_ready.is_set() else "Loading SymPy..."
+
+def current_problem():
+    return (mode_var.get(), inner_entry.get(), outer_entry.get(), variable_entry.get())
 
 def calculate():
-    global total_chain_result
-    mode = mode_var.get()
+    global preview_after
+    # A preview still waiting out the debounce would only redo this problem.
+    if preview_after is not None:
+        root.after_cancel(preview_after)
+        preview_after = None
     steps_box.delete("1.0", tk.END)
-    try:
-        if mode == "Chain Rule":
-            inner = inner_entry.get()
-            outer = outer_entry.get()
-            var = variable_entry.get()
-            result, steps = chain_rule_calculator(inner, outer, var)
-            total_chain_result = total_chain_result + result if total_chain_result else result
-            output_var.set(str(sp.simplify(total_chain_result)))
-            steps_box.insert(tk.END, steps)
-        elif mode == "Quotient Rule":
-            numerator = inner_entry.get()
-            denominator = outer_entry.get()
-            var = variable_entry.get()
-            result, steps = quotient_rule_calculator(numerator, denominator, var)
-            output_var.set(str(result))
-            steps_box.insert(tk.END, steps)
-            total_chain_result = None
-    except ValueError as ve:
-        messagebox.showerror("Input Error", str(ve))
-    except Exception as e:
-        messagebox.showerror("Error", str(e))
-
-def add_more():
-    if mode_var.get() != "Chain Rule":
-        messagebox.showinfo("Not Supported", "Add Equation is only for Chain Rule mode.")
+    submit_job(live=False)
+
+def submit_job(live):
+    global current_inputs
+    current_inputs = current_problem()
+    # Live jobs ask for the unsimplified derivative first, so something shows
+    # up right away even when simplify takes a while.
+    start_job(lambda: worker.submit(*current_inputs, preview=live), live)
+
+def submit_total():
+    # Simplifying the total can take seconds, so the worker does it and
+    # show_total finishes Add Equation.
+    global current_inputs, current_total
+    expression = running_total.expression()
+    start_job(lambda: worker.submit_simplify(expression, running_total.budget), False)
+    current_inputs = None
+    current_total = expression
+
+def start_job(submit, live):
+    global current_job, current_live, current_total, job_started, live_pending, polling
+    if worker.busy:
+        # A newer request supersedes whatever is still running.
+        worker.cancel()
+    live_pending = False
+    current_total = None
+    current_job = submit()
+    current_live = live
+    job_started = time.perf_counter()
+    set_busy(True)
+    if not polling:
+        polling = True
+        root.after(POLL_INTERVAL_MS, poll_worker)
+
+def on_input_changed(*args):
+    # Every edit lands here, typed or from the keypad; only the last one in a
+    # burst starts a computation.
+    global preview_after
+    if preview_after is not None:
+        root.after_cancel(preview_after)
+        preview_after = None
+    if live_var.get():
+        preview_after = root.after(PREVIEW_DELAY_MS, start_preview)
+
+def start_preview():
+    global preview_after, current_job, live_pending, uncommitted
+    preview_after = None
+    if not inner_entry.get().strip() or not outer_entry.get().strip():
+        uncommitted = None
         return
-    current_result = output_var.get().strip()
-    print(f"DEBUG: Current Result = {current_result}")  # Debugging line
-    if not current_result:
-        messagebox.showinfo("Error", "No result available. Please calculate first.")
+    if current_job is not None and not current_live and current_problem() == current_inputs:
+        # Calculate is already working on this exact problem.
         return
-    label_text = f"Base Result: {current_result}" if not result_boxes else f"Combined Result: {current_result}"
-    add_result_to_history(label_text)
-    inner_entry.delete(0, tk.END)
-    outer_entry.delete(0, tk.END)
-    steps_box.delete("1.0", tk.END)
-
-def add_result_to_history(label_text):
-    print(f"DEBUG: Adding to history: {label_text}")
-    result_label = ttk.Entry(history_frame, width=54)
-    result_label.insert(0, label_text)
-    result_label.config(state="readonly")
-    result_label.grid(column=0, row=len(result_boxes), padx=5, pady=2)
-    result_boxes.append(result_label)
-    print(f"DEBUG: Total results in history: {len(result_boxes)}")
-
-def reset_fields():
-    global total_chain_result, result_boxes
-    inner_entry.delete(0, tk.END)
-    outer_entry.delete(0, tk.END)
-    variable_entry.delete(0, tk.END)
-    output_var.set("")
+    if current_total is not None:
+        # Add Equation is finishing up and will clear the inputs.
+        return
+    if worker.busy and (time.perf_counter() - job_started) * 1000 < SUPERSEDED_GRACE_MS:
+        # Drop the running job's result and go again once it is done.
+        current_job = None
+        live_pending = True
+        return
+    submit_job(live=True)
+
+def poll_worker():
+    global polling
+    for outcome in worker.poll():
+        if outcome.job_id == current_job:
+            if current_total is not None:
+                show_total(outcome)
+            else:
+                show_outcome(outcome)
+    if live_pending and (not worker.busy or (time.perf_counter() - job_started) * 1000 >= SUPERSEDED_GRACE_MS):
+        submit_job(live=True)
+    if worker.busy:
+        root.after(POLL_INTERVAL_MS, poll_worker)
+    else:
+        polling = False
+
+def show_outcome(outcome):
+    global committed_inputs, current_job, uncommitted
+    if not outcome.preview:
+        current_job = None
+        set_busy(False)
+    if outcome.error is not None:
+        if current_live:
+            # No dialogs while typing; half-written input is expected.
+            status_var.set(f"Preview: {outcome.error}")
+            return
+        title = "Input Error" if isinstance(outcome.error, ValueError) else "Error"
+        messagebox.showerror(title, str(outcome.error))
+        return
+    result, steps = outcome.result
     steps_box.delete("1.0", tk.END)
-    total_chain_result = None
-    for box in result_boxes:
-        box.destroy()
-    result_boxes.clear()
-
-def update_fields(*args):
-    reset_fields()
-    mode = mode_var.get()
-    label1.config(text="Inner Function (e.g., 2*x+5)" if mode == "Chain Rule" else "Numerator")
-    label2.config(text="Outer Function (e.g., u^2)" if mode == "Chain Rule" else "Denominator")
-
-def set_focused_entry(event):
-    global focused_entry
-    focused_entry = event.widget
-
-def insert_to_focused_entry(value):
-    if focused_entry:
-        focused_entry.insert(tk.END, value)
-
-def clear_focused_entry():
-    if focused_entry:
-        focused_entry.delete(0, tk.END)
-
-def backspace_focused_entry():
-    if focused_entry:
-        current = focused_entry.get()
-        focused_entry.delete(0, tk.END)
-        focused_entry.insert(0, current[:-1])
-
-root = tk.Tk()
-root.title("Derivative Calculator - Chain & Quotient Rule")
-root.configure(bg="#1e1e2f")
-root.resizable(True, True)
-
-screen_width = root.winfo_screenwidth()
-screen_height = root.winfo_screenheight()
-window_width = 1366  
-window_height = 850  
-
-position_x = (screen_width - window_width) // 2
-position_y = (screen_height - window_height) // 2
-
-root.geometry(f"{window_width}x{window_height}+{position_x}+{position_y}")
-
-style = ttk.Style()
-style.theme_use('default')
-style.configure("TLabel", font=("Arial", 13), background="#1e1e2f", foreground="white")
-style.configure("TEntry", font=("Arial", 14), padding=5)
-style.configure("TButton", font=("Arial", 12), padding=5)
-style.configure("TCombobox", font=("Arial", 13))
-style.configure("TLabelframe", background="#1e1e2f", foreground="white")
-style.configure("TLabelframe.Label", background="#1e1e2f", foreground="white")
-style.configure("TFrame", background="#1e1e2f")
-
-root.columnconfigure(0, weight=1)
-root.columnconfigure(1, weight=1)
-root.rowconfigure(1, weight=1)
-
-top_frame = ttk.Frame(root, style="TFrame")
-top_frame.grid(column=0, row=0, columnspan=2, padx=10, pady=10, sticky="ew")
-
-title_label = ttk.Label(
-    top_frame,
-    text="DERIVATIVE CALCULATOR - CHAIN AND QUOTIENT RULE",
-    font=("Arial", 16, "bold"),
-    background="#1e1e2f",
-    foreground="white",
-    anchor="center"
-)
-title_label.pack(fill="x", padx=10, pady=(10, 5))
-
-instruction_frame = ttk.LabelFrame(top_frame, text="Instructions", padding=10, style="TLabelframe")
-instruction_frame.pack(fill="x", padx=10, pady=5)
-
-instruction_text = (
-    "1. Select the mode: Chain Rule or Quotient Rule.\n"
-    "2. Fill in the required functions and variable (e.g., x).\n"
-    "   - Chain Rule: use 'u' for outer function (e.g., sin(u), u^2, etc.)\n"
-    "   - Quotient Rule: specify numerator and denominator.\n"
-    "3. Click 'Calculate' to compute the derivative.\n\n"
-    "Limitations:\n"
-    "- Use '*' for multiplication (2*x not 2x).\n"
-    "- Use '^' or '**' for powers.\n"
-    "- Supported functions: sin, cos, tan, log, exp, sqrt.\n"
-    "- Only basic single-variable functions are supported."
-)
-instruction_label = ttk.Label(instruction_frame, text=instruction_text, justify="left", style="TLabel", anchor="w")
-instruction_label.pack(fill="x", padx=10, pady=5)
-
-mode_var = tk.StringVar(value="Chain Rule")
-output_var = tk.StringVar()
-
-# Left Section: Calculator
-left_frame = ttk.Frame(root, style="TFrame")
-left_frame.grid(column=0, row=1, padx=10, pady=15, sticky="nsew")
-
-ttk.Label(left_frame, text="Select Mode:").grid(column=0, row=0, padx=10, pady=5, sticky="w")
-mode_menu = ttk.Combobox(left_frame, textvariable=mode_var, values=["Chain Rule", "Quotient Rule"], state="readonly", width=20)
-mode_menu.grid(column=1, row=0, padx=10, pady=5, sticky="w")
-mode_menu.configure(font=("Arial", 13)) 
-mode_menu.bind("<<ComboboxSelected>>", update_fields)
-
-label1 = ttk.Label(left_frame, text="Inner Function:")
-label1.grid(column=0, row=1, padx=10, pady=5, sticky="w")
-inner_entry = ttk.Entry(left_frame, width=40)
-inner_entry.grid(column=1, row=1, padx=10, pady=5, sticky="w")
-
-label2 = ttk.Label(left_frame, text="Outer Function:")
-label2.grid(column=0, row=2, padx=10, pady=5, sticky="w")
-outer_entry = ttk.Entry(left_frame, width=40)
-outer_entry.grid(column=1, row=2, padx=10, pady=5, sticky="w")
-
-ttk.Label(left_frame, text="Variable (e.g., x):").grid(column=0, row=3, padx=10, pady=5, sticky="w")
-variable_entry = ttk.Entry(left_frame, width=15)
-variable_entry.grid(column=1, row=3, padx=10, pady=5, sticky="w")
-
-
-inner_entry.bind("<FocusIn>", set_focused_entry)
-outer_entry.bind("<FocusIn>", set_focused_entry)
-variable_entry.bind("<FocusIn>", set_focused_entry)
-
-button_frame = ttk.Frame(left_frame, style="TFrame")
-button_frame.grid(column=0, row=4, columnspan=2, pady=10)
-ttk.Button(button_frame, text="Calculate", command=calculate).grid(column=0, row=0, padx=5)
-ttk.Button(button_frame, text="Reset", command=reset_fields).grid(column=1, row=0, padx=5)
-ttk.Button(button_frame, text="Add Equation", command=add_more).grid(column=2, row=0, padx=5)
-
-ttk.Label(left_frame, text="Current Result:").grid(column=0, row=5, padx=10, pady=5, sticky="w")
-ttk.Entry(left_frame, textvariable=output_var, width=55).grid(column=1, row=5, padx=10, pady=5, sticky="w")
-
-ttk.Label(left_frame, text="Previous Results:").grid(column=0, row=6, padx=10, pady=10, sticky="w")
-
-history_frame = ttk.Frame(left_frame, style="TFrame")
-history_frame.grid(column=1, row=6, padx=10, pady=10, sticky="w")
-left_frame.rowconfigure(7, weight=1)
-history_frame.columnconfigure(0, weight=1)
-
-button_panel = ttk.LabelFrame(left_frame, text="Input Buttons", padding=10, style="TLabelframe")
-button_panel.grid(column=0, row=8, columnspan=2, padx=10, pady=10)
-
-
-buttons = [
-    ['7', '8', '9', '(', ')', 'Clear', '←'],
-    ['4', '5', '6', '*', '/', 'sin', 'cos'],
-    ['1', '2', '3', '+', '-', 'tan', 'log'],
-    ['exp', '0', '.', 'u', 'x', '^', '^2']
-]
-
-for r, row in enumerate(buttons):
-    for c, char in enumerate(row):
-        action = lambda val=char: insert_to_focused_entry(val if val != '^2' else '**2')
-        ttk.Button(button_panel, text=char, width=9, command=action).grid(row=r, column=c, padx=2, pady=2)
-
-for child in button_panel.winfo_children():
-    if child['text'] == 'Clear':
-        child.config(command=clear_focused_entry)
-    elif child['text'] == '←':
-        child.config(command=backspace_focused_entry)
-
-right_frame = ttk.Frame(root, style="TFrame")
-right_frame.grid(column=1, row=1, padx=10, pady=10, sticky="nsew")
-
-ttk.Label(right_frame, text="Step-by-step Solution:").grid(column=0, row=0, padx=10, pady=(0, 5), sticky="nw")
-steps_box = tk.Text(right_frame, width=55, bg="#282c34", fg="white", font=("Courier", 12))
-steps_box.grid(column=0, row=1, padx=10, pady=5, sticky="nsew")
-
-
-update_fields()
-root.update()
-left_frame.columnconfigure(1, weight=1)
-right_frame.columnconfigure(0, weight=1)
-right_frame.rowconfigure(1, weight=1)
-root.mainloop()
-import tkinter as tk
-from tkinter import ttk, messagebox
-import sympy as sp
-
-total_chain_result = None
-result_boxes = []
-focused_entry = None
-
-def validate_input(expression):
-    try:
-        expression = expression.replace('^', '**')
-        return sp.sympify(expression, locals={
-            "sin": sp.sin, "cos": sp.cos, "tan": sp.tan,
-            "exp": sp.exp, "log": sp.log, "sqrt": sp.sqrt
-        })
-    except (sp.SympifyError, SyntaxError):
-        raise ValueError("Invalid input! Use correct syntax: e.g., '2*x', 'x^2', or 'sin(u)'.")
-
-def chain_rule_calculator(inner_func, outer_func, variable):
-    x = sp.symbols(variable)
-    inner = validate_input(inner_func)
-    u = sp.Function('u')(x)
-
-    outer_expr = validate_input(outer_func.replace('u', str(u)))
-    inner_derivative = sp.diff(inner, x)
-
-    outer_func_clean = outer_func.replace(' ', '').lower()
-    manual = False
-
-    if outer_func_clean == "sin(u)":
-        outer_derivative = sp.cos(u)
-        manual = True
-        outer_rule_str = "cos(u)"
-    elif outer_func_clean == "cos(u)":
-        outer_derivative = -sp.sin(u)
-        manual = True
-        outer_rule_str = "-sin(u)"
-    elif outer_func_clean == "tan(u)":
-        outer_derivative = sp.sec(u)**2
-        manual = True
-        outer_rule_str = "sec(u)^2"
-    elif outer_func_clean == "cot(u)":
-        outer_derivative = -sp.csc(u)**2
-        manual = True
-        outer_rule_str = "-csc(u)^2"
-    elif outer_func_clean == "csc(u)":
-        outer_derivative = -sp.csc(u) * sp.cot(u)
-        manual = True
-        outer_rule_str = "-csc(u) cot(u)"
-    elif outer_func_clean == "sec(u)":
-        outer_derivative = sp.sec(u) * sp.tan(u)
-        manual = True
-        outer_rule_str = "sec(u) tan(u)"
-    elif '^' in outer_func_clean:
-        base, exponent = outer_func_clean.split('^')
-        if base == 'u' and exponent.isnumeric():
-            outer_derivative = int(exponent) * u**(int(exponent) - 1)
-            manual = True
-            outer_rule_str = f"{exponent}*u^{int(exponent) - 1}"
+    if current_live:
+        # A preview shows what Calculate would give without adding to the
+        # running total.
+        if outcome.result.mode == "Chain Rule" and current_inputs == committed_inputs:
+            # Calculate already added this one.
+            output_var.set(str(running_total.expression()))
+            uncommitted = None
+        elif outcome.result.mode == "Chain Rule":
+            output_var.set(str(running_total.expression() + result))
+            uncommitted = None if outcome.preview else result
+        else:
+            output_var.set(str(result))
+        if outcome.preview:
+            status_var.set("Simplifying...")
+    elif outcome.result.mode == "Chain Rule":
+        uncommitted = None
+        committed_inputs = current_inputs
+        # Like terms are merged as they come in; the full simplify waits
+        # until the total is exported with Add Equation.
+        running_total.add(result)
+        output_var.set(str(running_total.expression()))
+        if running_total.over_limit:
+            status_var.set(f"Warning: running total has {len(running_total)} terms.")
     else:
-        outer_derivative = sp.diff(outer_expr, u)
-        outer_rule_str = str(outer_derivative)
-
-    substituted = outer_derivative.subs(u, inner)
-    result = substituted * inner_derivative
-
-    steps = (
-        f"Step-by-step solution (Chain Rule):\n\n"
-        f"1. Let g({x}) = {inner}\n"
-        f"2. Let f(u) = {outer_func}\n"
-        f"3. Compute g'({x}) = {inner_derivative}\n"
-        f"4. Compute f'(u) = {outer_rule_str}\n"
-        f"5. Substitute u = g({x}) into f'(u): f'(g({x})) = {substituted}\n"
-        f"6. Multiply by g'({x}): {substituted} * {inner_derivative}\n"
-        f"7. Simplify: {sp.simplify(result)}"
-    )
-    return sp.simplify(result), steps
-
-def quotient_rule_calculator(numerator, denominator, variable):
-    x = sp.symbols(variable)
-    num = validate_input(numerator)
-    denom = validate_input(denominator)
-    num_derivative = sp.diff(num, x)
-    denom_derivative = sp.diff(denom, x)
-    result = (num_derivative * denom - num * denom_derivative) / denom**2
-    steps = (
-        f"Step-by-step solution (Quotient Rule):\n\n"
-        f"1. Let u(x) = {num}, v(x) = {denom}\n"
-        f"2. Compute u'({x}) = {num_derivative}, v'({x}) = {denom_derivative}\n"
-        f"3. Apply the quotient rule:\n"
-        f"   (u' * v - u * v') / v^2 = ({num_derivative} * {denom} - {num} * {denom_derivative}) / ({denom})^2\n"
-        f"4. Simplify: {sp.simplify(result)}"
-    )
-    return sp.simplify(result), steps
+        output_var.set(str(result))
+        running_total.clear()
+        committed_inputs = None
+    render_start = time.perf_counter()
+    show_steps(steps)
+    if outcome.trace is not None:
+        outcome.trace.add_phase("render", time.perf_counter() - render_start, 0.0)
+        status_var.set(outcome.trace.summary())
+        instrument.event("calculate", **outcome.trace.to_dict())
+
+def show_total(outcome):
+    global current_job, current_total
+    expression, current_total = current_total, None
+    current_job = None
+    set_busy(False)
+    if outcome.error is not None:
+        messagebox.showerror("Error", str(outcome.error))
+        return
+    running_total.set_simplified(expression, outcome.result)
+    output_var.set(str(outcome.result))
+    finish_add_more()
 
-def calculate():
-    global total_chain_result
-    mode = mode_var.get()
+def show_steps(steps):
     steps_box.delete("1.0", tk.END)
-    try:
-        if mode == "Chain Rule":
-            inner = inner_entry.get()
-            outer = outer_entry.get()
-            var = variable_entry.get()
-            result, steps = chain_rule_calculator(inner, outer, var)
-            total_chain_result = total_chain_result + result if total_chain_result else result
-            output_var.set(str(sp.simplify(total_chain_result)))
-            steps_box.insert(tk.END, steps)
-        elif mode == "Quotient Rule":
-            numerator = inner_entry.get()
-            denominator = outer_entry.get()
-            var = variable_entry.get()
-            result, steps = quotient_rule_calculator(numerator, denominator, var)
-            output_var.set(str(result))
-            steps_box.insert(tk.END, steps)
-            total_chain_result = None
-    except ValueError as ve:
-        messagebox.showerror("Input Error", str(ve))
-    except Exception as e:
-        messagebox.showerror("Error", str(e))
+    for tag in steps_box.tag_names():
+        if tag.startswith("elided_"):
+            steps_box.tag_delete(tag)
+    # Plain text is gathered up and inserted in one go between elided parts.
+    pending = []
+    for number, (text, elided) in enumerate(steps.render(STEPS_ELIDE_NODES)):
+        if elided is None:
+            pending.append(text)
+            continue
+        steps_box.insert(tk.END, "".join(pending))
+        pending = []
+        tag = f"elided_{number}"
+        steps_box.insert(tk.END, text, ("elided", tag))
+        steps_box.tag_bind(tag, "<Button-1>", lambda event, tag=tag, expr=elided: expand_elided(tag, expr))
+    steps_box.insert(tk.END, "".join(pending))
+
+def expand_elided(tag, expr):
+    ranges = steps_box.tag_ranges(tag)
+    if not ranges:
+        return
+    steps_box.delete(ranges[0], ranges[1])
+    steps_box.insert(ranges[0], str(expr))
+    steps_box.tag_delete(tag)
+
+def cancel_calculation():
+    global current_job, current_total, live_pending
+    worker.cancel()
+    current_job = None
+    current_total = None
+    live_pending = False
+    set_busy(False)
+
+def toggle_timing():
+    current = instrument.settings
+    instrument.configure(timing_var.get(), current.profile, current.memory)
+
+def set_busy(busy):
+    if busy:
+        status_var.set("Calculating...")
+        cancel_button.config(state="normal")
+        progress.start(10)
+    else:
+        status_var.set(idle_status())
+        cancel_button.config(state="disabled")
+        progress.stop()
+        if not worker.ready:
+            root.after(STARTUP_POLL_MS, wait_for_worker)
 
 def add_more():
+    global committed_inputs, uncommitted
     if mode_var.get() != "Chain Rule":
         messagebox.showinfo("Not Supported", "Add Equation is only for Chain Rule mode.")
         return
+    if uncommitted is not None:
+        running_total.add(uncommitted)
+        uncommitted = None
+    # Entering the same problem again from here on adds it again.
+    committed_inputs = None
+    if len(running_total):
+        simplified = running_total.simplified(compute=False)
+        if simplified is None:
+            submit_total()
+            return
+        output_var.set(str(simplified))
+    finish_add_more()
+
+def finish_add_more():
     current_result = output_var.get().strip()
-    print(f"DEBUG: Current Result = {current_result}")  # Debugging line
     if not current_result:
         messagebox.showinfo("Error", "No result available. Please calculate first.")
         return
-    label_text = f"Base Result: {current_result}" if not result_boxes else f"Combined Result: {current_result}"
+    label_text = f"Base Result: {current_result}" if not len(history) else f"Combined Result: {current_result}"
     add_result_to_history(label_text)
     inner_entry.delete(0, tk.END)
     outer_entry.delete(0, tk.END)
     steps_box.delete("1.0", tk.END)
 
 def add_result_to_history(label_text):
-    print(f"DEBUG: Adding to history: {label_text}")
-    result_label = ttk.Entry(history_frame, width=54)
-    result_label.insert(0, label_text)
-    result_label.config(state="readonly")
-    result_label.grid(column=0, row=len(result_boxes), padx=5, pady=2)
-    result_boxes.append(result_label)
-    print(f"DEBUG: Total results in history: {len(result_boxes)}")
+    history.append(label_text)
+    # Follow the newest entry, like the old list of boxes growing downwards.
+    show_history_from(len(history) - HISTORY_VISIBLE_ROWS)
+    instrument.event("history_add", label=label_text, entries=len(history), spilled=history.spilled)
+
+def show_history_from(top):
+    # The list box only ever holds the visible rows; scrolling swaps them out
+    # for the matching slice of the history.
+    global history_top
+    history_top = max(0, min(top, len(history) - HISTORY_VISIBLE_ROWS))
+    history_list.delete(0, tk.END)
+    for row in history.window(history_top, HISTORY_VISIBLE_ROWS):
+        history_list.insert(tk.END, row)
+    if len(history) > HISTORY_VISIBLE_ROWS:
+        history_scrollbar.set(history_top / len(history), (history_top + HISTORY_VISIBLE_ROWS) / len(history))
+    else:
+        history_scrollbar.set(0.0, 1.0)
+
+def scroll_history(action, amount, unit=None):
+    if action == "moveto":
+        show_history_from(round(float(amount) * len(history)))
+    elif unit == "pages":
+        show_history_from(history_top + int(amount) * HISTORY_VISIBLE_ROWS)
+    else:
+        show_history_from(history_top + int(amount))
+
+def on_history_wheel(event):
+    if event.num == 4 or event.delta > 0:
+        show_history_from(history_top - 1)
+    else:
+        show_history_from(history_top + 1)
+    return "break"
+
+def recall_history_entry(event):
+    # Double-click copies the entry's result, wherever it is stored.
+    selection = history_list.curselection()
+    if not selection:
+        return
+    text = history[history_top + selection[0]]
+    root.clipboard_clear()
+    root.clipboard_append(text.split(": ", 1)[-1])
+    status_var.set("Copied to clipboard.")
 
 def reset_fields():
-    global total_chain_result, result_boxes
+    global committed_inputs, uncommitted
+    cancel_calculation()
+    uncommitted = None
+    committed_inputs = None
     inner_entry.delete(0, tk.END)
     outer_entry.delete(0, tk.END)
     variable_entry.delete(0, tk.END)
     output_var.set("")
     steps_box.delete("1.0", tk.END)
-    total_chain_result = None
-    for box in result_boxes:
-        box.destroy()
-    result_boxes.clear()
+    running_total.clear()
+    history.clear()
+    show_history_from(0)
 
 def update_fields(*args):
     reset_fields()
@@ -507,147 +414,201 @@ def backspace_focused_entry():
         focused_entry.delete(0, tk.END)
         focused_entry.insert(0, current[:-1])
 
-root = tk.Tk()
-root.title("Derivative Calculator - Chain & Quotient Rule")
-root.configure(bg="#1e1e2f")
-root.resizable(True, True)
-
-screen_width = root.winfo_screenwidth()
-screen_height = root.winfo_screenheight()
-window_width = 1366  
-window_height = 850  
-
-position_x = (screen_width - window_width) // 2
-position_y = (screen_height - window_height) // 2
-
-root.geometry(f"{window_width}x{window_height}+{position_x}+{position_y}")
-
-style = ttk.Style()
-style.theme_use('default')
-style.configure("TLabel", font=("Arial", 13), background="#1e1e2f", foreground="white")
-style.configure("TEntry", font=("Arial", 14), padding=5)
-style.configure("TButton", font=("Arial", 12), padding=5)
-style.configure("TCombobox", font=("Arial", 12))
-style.configure("TLabelframe", background="#1e1e2f", foreground="white")
-style.configure("TLabelframe.Label", background="#1e1e2f", foreground="white")
-style.configure("TFrame", background="#1e1e2f")
-
-root.columnconfigure(0, weight=1)
-root.columnconfigure(1, weight=1)
-root.rowconfigure(1, weight=1)
-
-top_frame = ttk.Frame(root, style="TFrame")
-top_frame.grid(column=0, row=0, columnspan=2, padx=10, pady=10, sticky="ew")
-
-title_label = ttk.Label(
-    top_frame,
-    text="DERIVATIVE CALCULATOR - CHAIN AND QUOTIENT RULE",
-    font=("Arial", 16, "bold"),
-    background="#1e1e2f",
-    foreground="white",
-    anchor="center"
-)
-title_label.pack(fill="x", padx=10, pady=(10, 5))
-
-instruction_frame = ttk.LabelFrame(top_frame, text="Instructions", padding=10, style="TLabelframe")
-instruction_frame.pack(fill="x", padx=10, pady=5)
-
-instruction_text = (
-    "1. Select the mode: Chain Rule or Quotient Rule.\n"
-    "2. Fill in the required functions and variable (e.g., x).\n"
-    "   - Chain Rule: use 'u' for outer function (e.g., sin(u), u^2, etc.)\n"
-    "   - Quotient Rule: specify numerator and denominator.\n"
-    "3. Click 'Calculate' to compute the derivative.\n\n"
-    "Limitations:\n"
-    "- Use '*' for multiplication (2*x not 2x).\n"
-    "- Use '^' or '**' for powers.\n"
-    "- Supported functions: sin, cos, tan, log, exp, sqrt.\n"
-    "- Only basic single-variable functions are supported."
-)
-instruction_label = ttk.Label(instruction_frame, text=instruction_text, justify="left", style="TLabel", anchor="w")
-instruction_label.pack(fill="x", padx=10, pady=5)
-
-mode_var = tk.StringVar(value="Chain Rule")
-output_var = tk.StringVar()
-
-# Left Section: Calculator
-left_frame = ttk.Frame(root, style="TFrame")
-left_frame.grid(column=0, row=1, padx=10, pady=15, sticky="nsew")
-
-ttk.Label(left_frame, text="Select Mode:").grid(column=0, row=0, padx=10, pady=5, sticky="w")
-mode_menu = ttk.Combobox(left_frame, textvariable=mode_var, values=["Chain Rule", "Quotient Rule"], state="readonly", width=20)
-mode_menu.grid(column=1, row=0, padx=10, pady=5, sticky="w")
-mode_menu.configure(font=("Arial", 13)) 
-mode_menu.bind("<<ComboboxSelected>>", update_fields)
-
-label1 = ttk.Label(left_frame, text="Inner Function:")
-label1.grid(column=0, row=1, padx=10, pady=5, sticky="w")
-inner_entry = ttk.Entry(left_frame, width=40)
-inner_entry.grid(column=1, row=1, padx=10, pady=5, sticky="w")
-
-label2 = ttk.Label(left_frame, text="Outer Function:")
-label2.grid(column=0, row=2, padx=10, pady=5, sticky="w")
-outer_entry = ttk.Entry(left_frame, width=40)
-outer_entry.grid(column=1, row=2, padx=10, pady=5, sticky="w")
-
-ttk.Label(left_frame, text="Variable (e.g., x):").grid(column=0, row=3, padx=10, pady=5, sticky="w")
-variable_entry = ttk.Entry(left_frame, width=15)
-variable_entry.grid(column=1, row=3, padx=10, pady=5, sticky="w")
-
-
-inner_entry.bind("<FocusIn>", set_focused_entry)
-outer_entry.bind("<FocusIn>", set_focused_entry)
-variable_entry.bind("<FocusIn>", set_focused_entry)
-
-button_frame = ttk.Frame(left_frame, style="TFrame")
-button_frame.grid(column=0, row=4, columnspan=2, pady=10)
-ttk.Button(button_frame, text="Calculate", command=calculate).grid(column=0, row=0, padx=5)
-ttk.Button(button_frame, text="Reset", command=reset_fields).grid(column=1, row=0, padx=5)
-ttk.Button(button_frame, text="Add Equation", command=add_more).grid(column=2, row=0, padx=5)
-
-ttk.Label(left_frame, text="Current Result:").grid(column=0, row=5, padx=10, pady=5, sticky="w")
-ttk.Entry(left_frame, textvariable=output_var, width=55).grid(column=1, row=5, padx=10, pady=5, sticky="w")
-
-ttk.Label(left_frame, text="Previous Results:").grid(column=0, row=6, padx=10, pady=10, sticky="w")
-
-history_frame = ttk.Frame(left_frame, style="TFrame")
-history_frame.grid(column=1, row=6, padx=10, pady=10, sticky="w")
-left_frame.rowconfigure(7, weight=1)
-history_frame.columnconfigure(0, weight=1)
-
-button_panel = ttk.LabelFrame(left_frame, text="Input Buttons", padding=10, style="TLabelframe")
-button_panel.grid(column=0, row=8, columnspan=2, padx=10, pady=10)
-
-buttons = [
-    ['7', '8', '9', '+', '-', '(', ')'],
-    ['4', '5', '6', '*', '/', '^', 'x'],
-    ['1', '2', '3', 'u', 'sin', 'cos', 'exp'],
-    ['0', '.', 'Clear', '←', 'log', 'tan', '^2']
-]
-
-for r, row in enumerate(buttons):
-    for c, char in enumerate(row):
-        action = lambda val=char: insert_to_focused_entry(val if val != '^2' else '**2')
-        ttk.Button(button_panel, text=char, width=9, command=action).grid(row=r, column=c, padx=2, pady=2)
-
-for child in button_panel.winfo_children():
-    if child['text'] == 'Clear':
-        child.config(command=clear_focused_entry)
-    elif child['text'] == '←':
-        child.config(command=backspace_focused_entry)
-
-# Right Section: Solution
-right_frame = ttk.Frame(root, style="TFrame")
-right_frame.grid(column=1, row=1, padx=10, pady=10, sticky="nsew")
-
-ttk.Label(right_frame, text="Step-by-step Solution:").grid(column=0, row=0, padx=10, pady=(0, 5), sticky="nw")
-steps_box = tk.Text(right_frame, width=55, bg="#282c34", fg="white", font=("Courier", 12))
-steps_box.grid(column=0, row=1, padx=10, pady=5, sticky="nsew")
-
-
-update_fields()
-root.update()
-left_frame.columnconfigure(1, weight=1)
-right_frame.columnconfigure(0, weight=1)
-right_frame.rowconfigure(1, weight=1)
-root.mainloop()
\ No newline at end of file
+def build_window():
+    global root, mode_var, output_var, status_var, inner_entry, outer_entry, variable_entry
+    global label1, label2, history_list, history_scrollbar, steps_box, cancel_button, progress, timing_var, live_var
+
+    root = tk.Tk()
+    root.title("Derivative Calculator - Chain & Quotient Rule")
+    root.configure(bg="#1e1e2f")
+    root.resizable(True, True)
+
+    screen_width = root.winfo_screenwidth()
+    screen_height = root.winfo_screenheight()
+    window_width = 1366  
+    window_height = 850  
+
+    position_x = (screen_width - window_width) // 2
+    position_y = (screen_height - window_height) // 2
+
+    root.geometry(f"{window_width}x{window_height}+{position_x}+{position_y}")
+
+    style = ttk.Style()
+    style.theme_use('default')
+    style.configure("TLabel", font=("Arial", 13), background="#1e1e2f", foreground="white")
+    style.configure("TEntry", font=("Arial", 14), padding=5)
+    style.configure("TButton", font=("Arial", 12), padding=5)
+    style.configure("TCombobox", font=("Arial", 12))
+    style.configure("TLabelframe", background="#1e1e2f", foreground="white")
+    style.configure("TLabelframe.Label", background="#1e1e2f", foreground="white")
+    style.configure("TFrame", background="#1e1e2f")
+
+    root.columnconfigure(0, weight=1)
+    root.columnconfigure(1, weight=1)
+    root.rowconfigure(1, weight=1)
+
+    top_frame = ttk.Frame(root, style="TFrame")
+    top_frame.grid(column=0, row=0, columnspan=2, padx=10, pady=10, sticky="ew")
+
+    title_label = ttk.Label(
+        top_frame,
+        text="DERIVATIVE CALCULATOR - CHAIN AND QUOTIENT RULE",
+        font=("Arial", 16, "bold"),
+        background="#1e1e2f",
+        foreground="white",
+        anchor="center"
+    )
+    title_label.pack(fill="x", padx=10, pady=(10, 5))
+
+    instruction_frame = ttk.LabelFrame(top_frame, text="Instructions", padding=10, style="TLabelframe")
+    instruction_frame.pack(fill="x", padx=10, pady=5)
+
+    instruction_text = (
+        "1. Select the mode: Chain Rule or Quotient Rule.\n"
+        "2. Fill in the required functions and variable (e.g., x).\n"
+        "   - Chain Rule: use 'u' for outer function (e.g., sin(u), u^2, etc.)\n"
+        "   - Quotient Rule: specify numerator and denominator.\n"
+        "3. Click 'Calculate' to compute the derivative.\n\n"
+        "Limitations:\n"
+        "- '*' can be left out: 2x, 3(x+1) and x sin(x) all multiply.\n"
+        "- Use '^' or '**' for powers.\n"
+        "- Supported functions: sin, cos, tan, cot, sec, csc, asin, acos, atan,\n"
+        "  sinh, cosh, tanh, exp, log (or ln), sqrt, abs.\n"
+        "- Only basic single-variable functions are supported."
+    )
+    instruction_label = ttk.Label(instruction_frame, text=instruction_text, justify="left", style="TLabel", anchor="w")
+    instruction_label.pack(fill="x", padx=10, pady=5)
+
+    mode_var = tk.StringVar(value="Chain Rule")
+    output_var = tk.StringVar()
+
+    # Left Section: Calculator
+    left_frame = ttk.Frame(root, style="TFrame")
+    left_frame.grid(column=0, row=1, padx=10, pady=15, sticky="nsew")
+
+    ttk.Label(left_frame, text="Select Mode:").grid(column=0, row=0, padx=10, pady=5, sticky="w")
+    mode_menu = ttk.Combobox(left_frame, textvariable=mode_var, values=["Chain Rule", "Quotient Rule"], state="readonly", width=20)
+    mode_menu.grid(column=1, row=0, padx=10, pady=5, sticky="w")
+    mode_menu.configure(font=("Arial", 13)) 
+    mode_menu.bind("<<ComboboxSelected>>", update_fields)
+
+    label1 = ttk.Label(left_frame, text="Inner Function:")
+    label1.grid(column=0, row=1, padx=10, pady=5, sticky="w")
+    inner_entry = ttk.Entry(left_frame, width=40)
+    inner_entry.grid(column=1, row=1, padx=10, pady=5, sticky="w")
+
+    label2 = ttk.Label(left_frame, text="Outer Function:")
+    label2.grid(column=0, row=2, padx=10, pady=5, sticky="w")
+    outer_entry = ttk.Entry(left_frame, width=40)
+    outer_entry.grid(column=1, row=2, padx=10, pady=5, sticky="w")
+
+    ttk.Label(left_frame, text="Variable (e.g., x):").grid(column=0, row=3, padx=10, pady=5, sticky="w")
+    variable_entry = ttk.Entry(left_frame, width=15)
+    variable_entry.grid(column=1, row=3, padx=10, pady=5, sticky="w")
+
+
+    for entry in (inner_entry, outer_entry, variable_entry):
+        text = tk.StringVar()
+        entry.config(textvariable=text)
+        text.trace_add("write", on_input_changed)
+        # Keeps the variable alive; tkinter only holds it by name.
+        entry.text = text
+
+    inner_entry.bind("<FocusIn>", set_focused_entry)
+    outer_entry.bind("<FocusIn>", set_focused_entry)
+    variable_entry.bind("<FocusIn>", set_focused_entry)
+
+    button_frame = ttk.Frame(left_frame, style="TFrame")
+    button_frame.grid(column=0, row=4, columnspan=2, pady=10)
+    ttk.Button(button_frame, text="Calculate", command=calculate).grid(column=0, row=0, padx=5)
+    ttk.Button(button_frame, text="Reset", command=reset_fields).grid(column=1, row=0, padx=5)
+    ttk.Button(button_frame, text="Add Equation", command=add_more).grid(column=2, row=0, padx=5)
+    cancel_button = ttk.Button(button_frame, text="Cancel", command=cancel_calculation, state="disabled")
+    cancel_button.grid(column=3, row=0, padx=5)
+    progress = ttk.Progressbar(button_frame, mode="indeterminate", length=120)
+    progress.grid(column=4, row=0, padx=5)
+    status_var = tk.StringVar()
+    timing_var = tk.BooleanVar(value=instrument.settings.enabled)
+    ttk.Checkbutton(button_frame, text="Timing", variable=timing_var, command=toggle_timing).grid(column=5, row=0, padx=5)
+    live_var = tk.BooleanVar(value=True)
+    ttk.Checkbutton(button_frame, text="Live", variable=live_var, command=on_input_changed).grid(column=6, row=0, padx=5)
+    ttk.Label(left_frame, textvariable=status_var).grid(column=0, row=9, columnspan=2, padx=10, sticky="w")
+
+    ttk.Label(left_frame, text="Current Result:").grid(column=0, row=5, padx=10, pady=5, sticky="w")
+    ttk.Entry(left_frame, textvariable=output_var, width=55).grid(column=1, row=5, padx=10, pady=5, sticky="w")
+
+    ttk.Label(left_frame, text="Previous Results:").grid(column=0, row=6, padx=10, pady=10, sticky="w")
+
+    history_frame = ttk.Frame(left_frame, style="TFrame")
+    history_frame.grid(column=1, row=6, padx=10, pady=10, sticky="w")
+    left_frame.rowconfigure(7, weight=1)
+    history_frame.columnconfigure(0, weight=1)
+    history_list = tk.Listbox(
+        history_frame, width=54, height=HISTORY_VISIBLE_ROWS, activestyle="none",
+        bg="#282c34", fg="white", font=("Arial", 12), exportselection=False,
+    )
+    history_list.grid(column=0, row=0, sticky="ew")
+    history_scrollbar = ttk.Scrollbar(history_frame, orient="vertical", command=scroll_history)
+    history_scrollbar.grid(column=1, row=0, sticky="ns")
+    history_list.bind("<Double-Button-1>", recall_history_entry)
+    for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+        history_list.bind(sequence, on_history_wheel)
+
+    button_panel = ttk.LabelFrame(left_frame, text="Input Buttons", padding=10, style="TLabelframe")
+    button_panel.grid(column=0, row=8, columnspan=2, padx=10, pady=10)
+
+    buttons = [
+        ['7', '8', '9', '+', '-', '(', ')'],
+        ['4', '5', '6', '*', '/', '^', 'x'],
+        ['1', '2', '3', 'u', 'sin', 'cos', 'exp'],
+        ['0', '.', 'Clear', '←', 'log', 'tan', '^2']
+    ]
+
+    for r, row in enumerate(buttons):
+        for c, char in enumerate(row):
+            action = lambda val=char: insert_to_focused_entry(val if val != '^2' else '**2')
+            ttk.Button(button_panel, text=char, width=9, command=action).grid(row=r, column=c, padx=2, pady=2)
+
+    for child in button_panel.winfo_children():
+        if child['text'] == 'Clear':
+            child.config(command=clear_focused_entry)
+        elif child['text'] == '←':
+            child.config(command=backspace_focused_entry)
+
+    # Right Section: Solution
+    right_frame = ttk.Frame(root, style="TFrame")
+    right_frame.grid(column=1, row=1, padx=10, pady=10, sticky="nsew")
+
+    ttk.Label(right_frame, text="Step-by-step Solution:").grid(column=0, row=0, padx=10, pady=(0, 5), sticky="nw")
+    steps_box = tk.Text(right_frame, width=55, bg="#282c34", fg="white", font=("Courier", 12))
+    steps_box.grid(column=0, row=1, padx=10, pady=5, sticky="nsew")
+    steps_box.tag_configure("elided", foreground="#61afef", underline=True)
+    steps_box.tag_bind("elided", "<Enter>", lambda event: steps_box.config(cursor="hand2"))
+    steps_box.tag_bind("elided", "<Leave>", lambda event: steps_box.config(cursor=""))
+
+
+    update_fields()
+    root.update()
+    left_frame.columnconfigure(1, weight=1)
+    right_frame.columnconfigure(0, weight=1)
+    right_frame.rowconfigure(1, weight=1)
+
+def on_close():
+    worker.close()
+    history.close()
+    root.destroy()
+
+if __name__ == "__main__":
+    if instrument.settings.enabled:
+        logging.basicConfig(level=logging.INFO, format="%(message)s")
+    # Start the worker first so it imports sympy while the window is built;
+    # this process loads its own copy on a thread once the window is up.
+    # Calculate works straight away: a job sent before the worker is warm just
+    # waits in its queue.
+    worker.start()
+    build_window()
+    startup_times["window_shown_ms"] = (time.perf_counter() - LAUNCHED_AT) * 1000
+    threading.Thread(target=warm_up_sympy, daemon=True).start()
+    root.protocol("WM_DELETE_WINDOW", on_close)
+    root.after(STARTUP_POLL_MS, check_startup)
+    root.mainloop()
@@ -0,0 +1,64 @@
+#Public API. Names are imported on first use so that `import chain_rule` (or
+#any light submodule such as chain_rule.instrument) doesn't pay for importing
+#sympy; the GUI relies on this to show its window before sympy is loaded.
+
+import importlib
+
+_EXPORTS = {
+    "CacheStats": ".cache",
+    "LRUCache": ".cache",
+    "Limits": ".limits",
+    "ResourceLimitError": ".limits",
+    "ParseError": ".parser",
+    "parse": ".parser",
+    "ResultCache": ".result_cache",
+    "SimplifyBudget": ".simplify",
+    "Steps": ".steps",
+    "Form": ".simplify",
+    "evaluation_cost": ".simplify",
+    "quotient_forms": ".simplify",
+    "simplify_expression": ".simplify",
+    "FUNCTION_RULES": ".rules",
+    "differentiate": ".rules",
+    "register_rule": ".rules",
+    "Partial": ".higher",
+    "gradient": ".higher",
+    "hessian": ".higher",
+    "jacobian": ".higher",
+    "nth_derivative": ".higher",
+    "partial": ".higher",
+    "CHAIN_RULE": ".engine",
+    "ENGINE_VERSION": ".engine",
+    "MODES": ".engine",
+    "QUOTIENT_RULE": ".engine",
+    "DerivativeResult": ".engine",
+    "chain_rule_calculator": ".engine",
+    "chain_rule_fan_out": ".engine",
+    "chain_rule_grid": ".engine",
+    "compute_derivative": ".engine",
+    "derivative_cache": ".engine",
+    "disable_result_cache": ".engine",
+    "enable_result_cache": ".engine",
+    "nested_chain_rule_calculator": ".engine",
+    "normalize_input": ".engine",
+    "parse_cache": ".engine",
+    "preview_derivative": ".engine",
+    "quotient_rule_calculator": ".engine",
+    "result_forms": ".engine",
+    "validate_input": ".engine",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
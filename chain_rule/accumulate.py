@@ -0,0 +1,66 @@
+#Running total for the GUI's "Add Equation" flow. Each added result is split
+#into terms and like terms are merged as they arrive, so adding the Nth result
+#costs about the same as adding the first. Full simplification only happens
+#when simplified() is asked for, or is done elsewhere and handed back with
+#set_simplified().
+#
+#sympy is imported on first use: the GUI creates its RunningSum at start-up,
+#long before any result arrives.
+
+DEFAULT_MAX_TERMS = 200
+
+
+class RunningSum:
+    def __init__(self, max_terms=DEFAULT_MAX_TERMS, budget=None):
+        self.max_terms = max_terms
+        self.budget = budget
+        self._coefficients = {}
+        self._expression = None
+        self._simplified = None
+
+    def add(self, expr):
+        import sympy as sp
+
+        for term in sp.Add.make_args(expr):
+            coefficient, rest = term.as_coeff_Mul()
+            total = self._coefficients.get(rest, 0) + coefficient
+            if total == 0:
+                self._coefficients.pop(rest, None)
+            else:
+                self._coefficients[rest] = total
+        self._expression = None
+        self._simplified = None
+
+    def __len__(self):
+        return len(self._coefficients)
+
+    @property
+    def over_limit(self):
+        return len(self._coefficients) > self.max_terms
+
+    def expression(self):
+        # The combined sum with like terms merged, but not simplified.
+        if self._expression is None:
+            import sympy as sp
+
+            self._expression = sp.Add(*(c * rest for rest, c in self._coefficients.items()))
+        return self._expression
+
+    def simplified(self, compute=True):
+        # With compute=False, None unless it has been worked out already.
+        if self._simplified is None and compute:
+            from .simplify import simplify_expression
+
+            self._simplified = simplify_expression(self.expression(), self.budget)
+        return self._simplified
+
+    def set_simplified(self, expression, simplified):
+        # For a simplification done elsewhere (the GUI hands it to its worker
+        # process). Ignored if the total has changed since `expression`.
+        if expression == self.expression():
+            self._simplified = simplified
+
+    def clear(self):
+        self._coefficients.clear()
+        self._expression = None
+        self._simplified = None
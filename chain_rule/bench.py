@@ -0,0 +1,159 @@
+#Headless benchmark harness: `python -m chain_rule bench`. Runs a versioned
+#corpus of chain and quotient problems, reports latency percentiles, peak
+#memory and per-phase time shares, and compares against a saved baseline.
+
+import json
+import platform
+from pathlib import Path
+
+import sympy as sp
+
+from . import canonical, instrument
+from .cli import record_to_job
+from .engine import ENGINE_VERSION, compute_derivative, derivative_cache, parse_cache
+from .simplify import forms_cache, simplify_cache
+
+CORPUS_VERSION = "1"
+DEFAULT_CORPUS = Path(__file__).with_name(f"bench_corpus_v{CORPUS_VERSION}.jsonl")
+
+
+def load_corpus(path=None):
+    path = Path(path or DEFAULT_CORPUS)
+    with path.open(encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def percentile(values, q):
+    # Linear interpolation between closest ranks; q in [0, 100].
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    position = (len(ordered) - 1) * q / 100
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def _percentiles(values):
+    return {f"p{q}_ms": round(percentile(values, q), 3) for q in (50, 95, 99)}
+
+
+def reset_caches():
+    parse_cache.clear()
+    derivative_cache.clear()
+    canonical.clear()
+    simplify_cache.clear()
+    forms_cache.clear()
+    sp.core.cache.clear_cache()
+
+
+def _run_once(job, memory=False):
+    instrument.configure(True, memory=memory)
+    with instrument.trace("bench") as trace:
+        compute_derivative(*job)
+    return trace
+
+
+def run_benchmark(corpus, repeats=5, warm=False):
+    saved = instrument.settings
+    problems = {}
+    all_latencies = []
+    tier_latencies = {}
+    phase_totals = {}
+    total_wall = 0.0
+    try:
+        for record in corpus:
+            job = record_to_job(record)
+            entry = {"tier": record.get("tier", "unknown"), "mode": job[0]}
+            latencies = []
+            try:
+                for _ in range(repeats):
+                    if not warm:
+                        reset_caches()
+                    trace = _run_once(job)
+                    latencies.append(trace.wall_ms)
+                    total_wall += trace.wall_ms
+                    for name, phase in trace.phases.items():
+                        phase_totals[name] = phase_totals.get(name, 0.0) + phase["wall_ms"]
+                # tracemalloc slows everything down, so peak memory gets its
+                # own run instead of skewing the timed ones.
+                if not warm:
+                    reset_caches()
+                entry["peak_memory_kb"] = round(_run_once(job, memory=True).peak_memory_kb, 1)
+            except Exception as e:
+                entry["error"] = str(e)
+                problems[record.get("id", str(len(problems)))] = entry
+                continue
+            entry.update(_percentiles(latencies))
+            problems[record.get("id", str(len(problems)))] = entry
+            all_latencies += latencies
+            tier_latencies.setdefault(entry["tier"], []).extend(latencies)
+    finally:
+        instrument.settings = saved
+
+    peaks = [entry["peak_memory_kb"] for entry in problems.values() if "peak_memory_kb" in entry]
+    summary = {"count": len(all_latencies), **(_percentiles(all_latencies) if all_latencies else {})}
+    summary["peak_memory_kb_max"] = max(peaks, default=0)
+    summary["phase_share"] = {
+        name: round(value / total_wall, 4) for name, value in phase_totals.items()
+    } if total_wall else {}
+    return {
+        "corpus_version": CORPUS_VERSION,
+        "engine_version": ENGINE_VERSION,
+        "python": platform.python_version(),
+        "sympy": sp.__version__,
+        "repeats": repeats,
+        "warm": warm,
+        "summary": summary,
+        "tiers": {tier: _percentiles(values) for tier, values in tier_latencies.items()},
+        "problems": problems,
+    }
+
+
+def compare(report, baseline, threshold=0.25, min_delta_ms=1.0):
+    # Returns a list of human-readable regressions; empty means the gate
+    # passes. A metric regresses when it is more than `threshold` (relative)
+    # and `min_delta_ms` (absolute, to ignore sub-millisecond noise) worse.
+    regressions = []
+
+    def check(label, current, previous, unit="ms", min_delta=min_delta_ms):
+        if current is None or previous is None:
+            return
+        if current > previous * (1 + threshold) and current - previous > min_delta:
+            regressions.append(f"{label}: {previous:.3f} -> {current:.3f} {unit} (+{(current / previous - 1) * 100:.0f}%)")
+
+    for key in ("p50_ms", "p95_ms", "p99_ms"):
+        check(f"overall {key}", report["summary"].get(key), baseline["summary"].get(key))
+    check("overall peak memory", report["summary"].get("peak_memory_kb_max"),
+          baseline["summary"].get("peak_memory_kb_max"), unit="KiB", min_delta=64)
+    for tier, values in report["tiers"].items():
+        check(f"tier {tier} p50_ms", values.get("p50_ms"), baseline.get("tiers", {}).get(tier, {}).get("p50_ms"))
+    for problem_id, entry in report["problems"].items():
+        previous = baseline.get("problems", {}).get(problem_id)
+        if previous is None:
+            continue
+        if "error" in entry and "error" not in previous:
+            regressions.append(f"{problem_id}: now fails ({entry['error']})")
+            continue
+        check(f"{problem_id} p50_ms", entry.get("p50_ms"), previous.get("p50_ms"))
+    return regressions
+
+
+def format_report(report):
+    summary = report["summary"]
+    lines = [
+        f"corpus v{report['corpus_version']}, engine v{report['engine_version']}, "
+        f"{report['repeats']} repeats, {'warm' if report['warm'] else 'cold'} caches",
+        f"overall  p50 {summary.get('p50_ms', 0):9.3f} ms  p95 {summary.get('p95_ms', 0):9.3f} ms  "
+        f"p99 {summary.get('p99_ms', 0):9.3f} ms  peak {summary['peak_memory_kb_max']:.1f} KiB",
+    ]
+    for tier, values in report["tiers"].items():
+        lines.append(f"{tier:<8} p50 {values['p50_ms']:9.3f} ms  p95 {values['p95_ms']:9.3f} ms  p99 {values['p99_ms']:9.3f} ms")
+    shares = ", ".join(f"{name} {share * 100:.1f}%" for name, share in summary["phase_share"].items())
+    lines.append(f"phase share: {shares}")
+    for problem_id, entry in report["problems"].items():
+        if "error" in entry:
+            lines.append(f"  {problem_id:<28} ERROR {entry['error']}")
+        else:
+            lines.append(f"  {problem_id:<28} p50 {entry['p50_ms']:9.3f} ms  peak {entry['peak_memory_kb']:8.1f} KiB")
+    return "\n".join(lines)
@@ -0,0 +1,61 @@
+#Canonical forms for parsed inputs, so equivalent problems share cached work.
+#
+#SymPy already orders the arguments of sums and products, so `x^2+1` and
+#`1 + x**2` parse to equal trees. On top of that the differentiation variable
+#is renamed to a fixed placeholder, so g(t) in t and g(x) in x become the same
+#expression, and equal canonical forms are interned (hash-consed) so every
+#cache sees one shared object. The digest is a hash of the canonical srepr,
+#stable across processes, which makes it usable as a persistent cache key.
+
+import hashlib
+
+import sympy as sp
+
+from .cache import LRUCache
+
+# Can't come out of the parser ('@' isn't valid in a name), so it never
+# clashes with a symbol the user typed, and it is safe to swap back in text.
+PLACEHOLDER_NAME = "@x"
+PLACEHOLDER = sp.Symbol(PLACEHOLDER_NAME)
+
+# digest -> the one shared canonical expression
+_interned = LRUCache(max_entries=8192)
+# (expr, variable) -> (canonical expression, digest)
+_canonical = LRUCache(max_entries=8192)
+
+
+def digest(expr):
+    return hashlib.blake2b(sp.srepr(expr).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def canonicalize(expr, variable):
+    # Returns (canonical_expr, digest) with `variable` (a Symbol) renamed to
+    # PLACEHOLDER.
+    key = (expr, variable)
+    hit = _canonical.get(key)
+    if hit is not None:
+        return hit
+    if PLACEHOLDER in expr.free_symbols:
+        raise ValueError(f"'{PLACEHOLDER_NAME}' is reserved; use another symbol name.")
+    renamed = expr.xreplace({variable: PLACEHOLDER})
+    key_digest = digest(renamed)
+    shared = _interned.get(key_digest)
+    if shared is None:
+        _interned.put(key_digest, renamed)
+        shared = renamed
+    _canonical.put(key, (shared, key_digest))
+    return shared, key_digest
+
+
+def restore(expr, variable):
+    # Inverse of canonicalize's renaming.
+    return expr.xreplace({PLACEHOLDER: variable})
+
+
+def restore_text(text, variable):
+    return text.replace(PLACEHOLDER_NAME, str(variable))
+
+
+def clear():
+    _interned.clear()
+    _canonical.clear()
@@ -0,0 +1,274 @@
+#Command-line front-end: `python -m chain_rule <command> ...`.
+
+import argparse
+import csv
+import json
+import sys
+from dataclasses import replace
+
+from .engine import CHAIN_RULE, QUOTIENT_RULE
+
+_MODE_ALIASES = {
+    "chain": CHAIN_RULE,
+    "chain rule": CHAIN_RULE,
+    "chain_rule": CHAIN_RULE,
+    "quotient": QUOTIENT_RULE,
+    "quotient rule": QUOTIENT_RULE,
+    "quotient_rule": QUOTIENT_RULE,
+}
+
+
+def _read_records(stream, fmt):
+    if fmt == "csv":
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        line = line.strip()
+        if line:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                yield {"_error": f"Invalid JSON: {e}"}
+
+
+def record_to_job(record):
+    # Accepts inner/outer or numerator/denominator field names, preferring
+    # the pair that matches the mode: a CSV for a mixed set has all four
+    # columns, with the other pair left empty. Bad records still become jobs;
+    # the engine rejects them and they come back as error records in their
+    # proper place.
+    if "_error" in record:
+        return ("invalid", "", "", "")
+    mode = str(record.get("mode") or "chain").strip()
+    mode = _MODE_ALIASES.get(mode.lower(), mode)
+    fields = ("numerator", "denominator", "inner", "outer")
+    if mode != QUOTIENT_RULE:
+        fields = fields[2:] + fields[:2]
+    first = record.get(fields[0]) or record.get(fields[2]) or ""
+    second = record.get(fields[1]) or record.get(fields[3]) or ""
+    variable = record.get("variable") or "x"
+    return (mode, str(first), str(second), str(variable))
+
+
+def outcome_to_record(index, source, outcome, elapsed, steps_format="text"):
+    record = {"index": index}
+    if "id" in source:
+        record["id"] = source["id"]
+    if outcome.error is not None:
+        record["error"] = source.get("_error") or str(outcome.error)
+        record["error_type"] = "ValueError" if "_error" in source else type(outcome.error).__name__
+        if "_error" not in source and hasattr(outcome.error, "to_dict"):
+            # ResourceLimitError: which limit, and by how much; ParseError:
+            # where in the input.
+            record.update(outcome.error.to_dict())
+    else:
+        record["mode"] = outcome.result.mode
+        record["result"] = str(outcome.result.result)
+        steps = outcome.result.steps
+        if steps_format == "json":
+            record["steps"] = steps.to_dict()
+        elif steps_format == "latex":
+            record["steps"] = steps.latex()
+        elif steps_format == "text":
+            record["steps"] = steps.text()
+        if outcome.verified is not None:
+            record["verified"] = outcome.verified
+    record["elapsed_ms"] = round(elapsed * 1000, 3)
+    return record
+
+
+def run_batch(args):
+    from .worker import WorkerPool
+
+    fmt = args.format
+    if fmt is None:
+        fmt = "csv" if args.input.endswith(".csv") else "jsonl"
+    source = sys.stdin if args.input == "-" else open(args.input, newline="", encoding="utf-8")
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+
+    # Source records wait here until their result is written, so memory is
+    # bounded by the pool's look-ahead window, not by the input size.
+    sources = {}
+
+    def jobs():
+        for index, record in enumerate(_read_records(source, fmt)):
+            sources[index] = record
+            yield record_to_job(record)
+
+    pool = WorkerPool(
+        args.workers, limits=_limits_from_args(args),
+        result_cache=args.result_cache, result_cache_preload=args.result_cache_preload,
+    )
+    pool.start()
+    failures = 0
+    try:
+        outcomes = pool.imap(jobs(), timeout=args.timeout, ordered=not args.unordered, verify=args.verify)
+        for index, outcome, elapsed in outcomes:
+            record = outcome_to_record(index, sources.pop(index), outcome, elapsed, args.steps)
+            failures += "error" in record or record.get("verified", {}).get("passed") is False
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+    finally:
+        pool.close()
+        if source is not sys.stdin:
+            source.close()
+        if out is not sys.stdout:
+            out.close()
+    return 1 if failures and args.fail_on_error else 0
+
+
+def run_bench(args):
+    from . import bench
+
+    corpus = bench.load_corpus(args.corpus)
+    report = bench.run_benchmark(corpus, repeats=args.repeats, warm=args.warm)
+    print(bench.format_report(report))
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.save_baseline}")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("corpus_version") != report["corpus_version"]:
+            print(f"Baseline is for corpus v{baseline.get('corpus_version')}, not v{report['corpus_version']}.", file=sys.stderr)
+            return 2
+        regressions = bench.compare(report, baseline, args.threshold, args.min_delta_ms)
+        if regressions:
+            print(f"{len(regressions)} regression(s) over {args.threshold * 100:.0f}%:", file=sys.stderr)
+            for line in regressions:
+                print(f"  {line}", file=sys.stderr)
+            return 1
+        print("No regressions against baseline.")
+    return 0
+
+
+def run_export(args):
+    from .codegen import export
+    from .engine import compute_derivative
+
+    mode, first, second, variable = record_to_job({
+        "mode": args.mode, "inner": args.first, "outer": args.second, "variable": args.variable,
+    })
+    try:
+        result = compute_derivative(mode, first, second, variable)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    code = export(result, args.language, include_function=not args.derivative_only, name=args.name)
+    if args.output == "-":
+        sys.stdout.write(code.source)
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(code.source)
+    if args.harness:
+        with open(args.harness, "w", encoding="utf-8") as f:
+            f.write(code.harness)
+    if args.self_test:
+        passed, output = code.run_harness()
+        print(output, end="", file=sys.stderr)
+        return 0 if passed else 1
+    return 0
+
+
+def run_serve(args):
+    import asyncio
+
+    from .server import serve
+
+    try:
+        asyncio.run(serve(
+            args.host, args.port, args.unix,
+            workers=args.workers, max_pending=args.max_pending, max_deadline=args.deadline,
+            limits=_limits_from_args(args),
+            result_cache=args.result_cache, result_cache_preload=args.result_cache_preload,
+        ))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def _add_limit_arguments(parser):
+    parser.add_argument("--cpu-seconds", type=float, help="CPU-time limit per item (default: 20).")
+    parser.add_argument("--wall-seconds", type=float, help="Wall-time limit per item (default: 30).")
+    parser.add_argument("--memory-mb", type=int, help="Memory cap per worker process (default: 1024).")
+    parser.add_argument("--max-ops", type=int, help="Largest input size, in count_ops (default: 500).")
+
+
+def _add_result_cache_arguments(parser):
+    parser.add_argument("--result-cache", metavar="PATH", help="SQLite file of solved problems, shared by the workers and kept across runs.")
+    parser.add_argument("--result-cache-preload", type=int, default=0, metavar="N", help="Rows each worker loads from the result cache at start-up (default: 0).")
+
+
+def _limits_from_args(args):
+    from .limits import current_limits
+
+    changes = {
+        name: getattr(args, name)
+        for name in ("cpu_seconds", "wall_seconds", "memory_mb", "max_ops")
+        if getattr(args, name) is not None
+    }
+    return replace(current_limits(), **changes)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m chain_rule", description="Chain and quotient rule derivative tools.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    batch = commands.add_parser("batch", help="Solve a JSONL or CSV problem set in parallel, streaming JSONL results.")
+    batch.add_argument("input", help="Input file, or - for stdin.")
+    batch.add_argument("-o", "--output", default="-", help="Output JSONL file (default: stdout).")
+    batch.add_argument("--format", choices=["jsonl", "csv"], help="Input format (default: from the file extension, else jsonl).")
+    batch.add_argument("-j", "--workers", type=int, default=None, help="Worker processes (default: all cores).")
+    batch.add_argument("--timeout", type=float, default=None, help="Per-item timeout in seconds.")
+    batch.add_argument("--unordered", action="store_true", help="Write results as they finish instead of in input order.")
+    batch.add_argument("--verify", action="store_true", help="Spot-check each result numerically (needs NumPy).")
+    batch.add_argument("--steps", choices=["text", "json", "latex", "none"], default="text", help="How to write each result's steps (default: text).")
+    batch.add_argument("--fail-on-error", action="store_true", help="Exit with status 1 if any item failed or failed verification.")
+    _add_limit_arguments(batch)
+    _add_result_cache_arguments(batch)
+    batch.set_defaults(handler=run_batch)
+
+    bench = commands.add_parser("bench", help="Benchmark the calculators on a problem corpus.")
+    bench.add_argument("--corpus", help="Corpus JSONL file (default: the bundled versioned corpus).")
+    bench.add_argument("--repeats", type=int, default=5, help="Timed runs per problem (default: 5).")
+    bench.add_argument("--warm", action="store_true", help="Keep parse/simplify caches between runs.")
+    bench.add_argument("--report", help="Write the full JSON report here.")
+    bench.add_argument("--save-baseline", help="Save this run as a JSON baseline.")
+    bench.add_argument("--baseline", help="Compare against this baseline and fail on regressions.")
+    bench.add_argument("--threshold", type=float, default=0.25, help="Allowed relative slowdown (default: 0.25).")
+    bench.add_argument("--min-delta-ms", type=float, default=1.0, help="Ignore slowdowns smaller than this (default: 1.0).")
+    bench.set_defaults(handler=run_bench)
+
+    export = commands.add_parser("export", help="Emit a derivative as C, NumPy or Numba source.")
+    export.add_argument("mode", help="chain or quotient.")
+    export.add_argument("first", help="Inner function (chain) or numerator (quotient).")
+    export.add_argument("second", help="Outer function in u (chain) or denominator (quotient).")
+    export.add_argument("--variable", default="x", help="Variable to differentiate by (default: x).")
+    export.add_argument("--language", choices=["c", "numpy", "numba"], default="c", help="Output language (default: c).")
+    export.add_argument("--derivative-only", action="store_true", help="Emit f' alone instead of the fused f, f' function.")
+    export.add_argument("--name", help="Name of the generated function (default: f_df, or df).")
+    export.add_argument("-o", "--output", default="-", help="Output file (default: stdout).")
+    export.add_argument("--harness", help="Also write the self-test and benchmark program here.")
+    export.add_argument("--self-test", action="store_true", help="Build and run the harness; exit 1 if it fails.")
+    export.set_defaults(handler=run_export)
+
+    serve = commands.add_parser("serve", help="Run the local JSON derivative service.")
+    serve.add_argument("--host", default="127.0.0.1", help="Address to bind (default: 127.0.0.1).")
+    serve.add_argument("--port", type=int, default=8765, help="Port to bind (default: 8765).")
+    serve.add_argument("--unix", help="Listen on this Unix socket path instead of TCP.")
+    serve.add_argument("-j", "--workers", type=int, default=None, help="Worker processes (default: all cores).")
+    serve.add_argument("--max-pending", type=int, default=256, help="Distinct computations allowed in flight before 503 (default: 256).")
+    serve.add_argument("--deadline", type=float, default=10.0, help="Longest per-request deadline in seconds (default: 10).")
+    _add_limit_arguments(serve)
+    _add_result_cache_arguments(serve)
+    serve.set_defaults(handler=run_serve)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
@@ -0,0 +1,264 @@
+#Export a derivative (and optionally the original function) as standalone C,
+#NumPy or Numba source, for pasting into simulation code.
+#
+#The function and its derivative go through one joint sp.cse pass, so a
+#subexpression they share (often the inner function, or the sin/cos/exp of
+#it) is computed once and both values come out of one fused call. Each export
+#also comes with a harness program that checks the generated code against
+#values computed by sympy at high precision and then times it.
+
+import os
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+from dataclasses import dataclass
+
+import sympy as sp
+
+LANGUAGES = ("c", "numpy", "numba")
+
+# Reference values are computed with this many significant digits.
+_REFERENCE_DIGITS = 30
+
+# The M_* constants sympy's C printer uses are POSIX, not ISO C, so the
+# generated code defines any it needs that math.h doesn't.
+_C_CONSTANTS = {
+    "M_E": "2.718281828459045235360287471352662498",
+    "M_LOG2E": "1.442695040888963407359924681001892137",
+    "M_LOG10E": "0.434294481903251827651128918916605082",
+    "M_LN2": "0.693147180559945309417232121458176568",
+    "M_LN10": "2.302585092994045684017991454684364208",
+    "M_PI": "3.141592653589793238462643383279502884",
+    "M_PI_2": "1.570796326794896619231321691639751442",
+    "M_PI_4": "0.785398163397448309615660845819875721",
+    "M_1_PI": "0.318309886183790671537767526745028724",
+    "M_2_PI": "0.636619772367581343075535053490057448",
+    "M_2_SQRTPI": "1.128379167095512573896158903121545172",
+    "M_SQRT2": "1.414213562373095048801688724209698079",
+    "M_SQRT1_2": "0.707106781186547524400844362104849039",
+}
+
+
+@dataclass(frozen=True)
+class GeneratedCode:
+    language: str
+    # The function(s) to paste in.
+    source: str
+    # A complete program: the source plus a self-test and a micro-benchmark.
+    harness: str
+    # Entry point in `source` and its arguments: the variable, then any other
+    # symbols in sorted order.
+    name: str
+    arguments: tuple
+
+    def run_harness(self, timeout=120):
+        # Builds (for C) and runs the harness. Returns (passed, output).
+        with tempfile.TemporaryDirectory(prefix="chain_rule_codegen_") as folder:
+            if self.language == "c":
+                compiler = os.environ.get("CC") or shutil.which("cc") or shutil.which("gcc")
+                if compiler is None:
+                    raise RuntimeError("No C compiler found; set CC.")
+                path = os.path.join(folder, "harness.c")
+                program = os.path.join(folder, "harness")
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(self.harness)
+                build = subprocess.run([compiler, "-O2", "-o", program, path, "-lm"], capture_output=True, text=True)
+                if build.returncode != 0:
+                    return False, build.stderr
+                command = [program]
+            else:
+                path = os.path.join(folder, "harness.py")
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(self.harness)
+                command = [sys.executable, path]
+            run = subprocess.run(command, capture_output=True, text=True, timeout=timeout)
+            return run.returncode == 0, run.stdout + run.stderr
+
+
+def export(result, language="c", include_function=True, name=None, samples=16, seed=0):
+    # `result` is a DerivativeResult. With include_function the entry point
+    # returns (f, f') together; otherwise just f'.
+    if language not in LANGUAGES:
+        raise ValueError(f"Unknown language {language!r}; expected one of {', '.join(LANGUAGES)}.")
+    if include_function and result.function is None:
+        raise ValueError("This result doesn't carry its original function; export it with include_function=False.")
+    x = sp.Symbol(result.variable)
+    outputs = [result.function, result.result] if include_function else [result.result]
+    others = sorted(set().union(*(expr.free_symbols for expr in outputs)) - {x}, key=str)
+    arguments = (x, *others)
+    name = name or ("f_df" if include_function else "df")
+
+    assignments, reduced = sp.cse(outputs, symbols=_temporaries(outputs), optimizations="basic")
+    points = _reference_points(outputs, arguments, samples, seed)
+    if language == "c":
+        source = _c_source(name, arguments, assignments, reduced)
+        harness = _c_harness(source, name, arguments, len(outputs), points)
+    else:
+        source = _python_source(name, arguments, assignments, reduced, numba=language == "numba")
+        harness = _python_harness(source, name, arguments, len(outputs), points, numba=language == "numba")
+    return GeneratedCode(language, source, harness, name, tuple(str(a) for a in arguments))
+
+
+def _temporaries(outputs):
+    # t0, t1, ... skipping any name the expressions already use.
+    taken = {str(s) for expr in outputs for s in expr.free_symbols}
+    return (sp.Symbol(f"t{i}") for i in range(10**9) if f"t{i}" not in taken)
+
+
+def _reference_points(outputs, arguments, samples, seed):
+    # Points where every output is real and finite, with values from sympy's
+    # own arbitrary-precision evaluation. Extra symbols get fixed values.
+    rng = random.Random(seed)
+    fixed = {symbol: sp.Float(0.5 + 0.25 * i) for i, symbol in enumerate(arguments[1:])}
+    points = []
+    for _ in range(samples * 4):
+        if len(points) == samples:
+            break
+        value = sp.Float(round(rng.uniform(-3, 3), 6))
+        subs = {arguments[0]: value, **fixed}
+        expected = []
+        for expr in outputs:
+            evaluated = expr.evalf(_REFERENCE_DIGITS, subs=subs)
+            if not evaluated.is_real or not evaluated.is_finite or not evaluated.is_Number:
+                break
+            expected.append(float(evaluated))
+        else:
+            points.append(([float(subs[a]) for a in arguments], expected))
+    return points
+
+
+def _c_source(name, arguments, assignments, reduced):
+    params = ", ".join(f"double {a}" for a in arguments)
+    lines = []
+    if len(reduced) == 2:
+        lines.append(f"static inline void {name}({params}, double *out_f, double *out_df)")
+    else:
+        lines.append(f"static inline double {name}({params})")
+    lines.append("{")
+    for symbol, expr in assignments:
+        lines.append(f"    const double {symbol} = {sp.ccode(expr, standard='c99')};")
+    if len(reduced) == 2:
+        lines.append(f"    *out_f = {sp.ccode(reduced[0], standard='c99')};")
+        lines.append(f"    *out_df = {sp.ccode(reduced[1], standard='c99')};")
+    else:
+        lines.append(f"    return {sp.ccode(reduced[0], standard='c99')};")
+    lines.append("}")
+    body = "\n".join(lines) + "\n"
+
+    header = ["#include <math.h>", ""]
+    for constant in sorted(set(re.findall(r"\bM_[0-9A-Z_]+\b", body))):
+        if constant in _C_CONSTANTS:
+            header += [f"#ifndef {constant}", f"#define {constant} {_C_CONSTANTS[constant]}", "#endif"]
+    return "\n".join(header) + ("\n\n" if len(header) > 2 else "\n") + body
+
+
+def _c_harness(source, name, arguments, outputs, points):
+    arity = len(arguments)
+    inputs = ",\n".join("    {" + ", ".join(repr(v) for v in values) + "}" for values, _ in points) or "    {0}"
+    expected = ",\n".join("    {" + ", ".join(repr(v) for v in values) + "}" for _, values in points) or "    {0}"
+    args = ", ".join(f"in[i][{k}]" for k in range(arity))
+    bench_args = ", ".join(["x"] + [f"in[0][{k}]" for k in range(1, arity)])
+    if outputs == 2:
+        call = f"double got[2]; {name}({args}, &got[0], &got[1]);"
+        bench_call = f"double a, b; {name}({bench_args}, &a, &b); sink += a + b;"
+    else:
+        call = f"double got[1]; got[0] = {name}({args});"
+        bench_call = f"sink += {name}({bench_args});"
+    return f"""{source}
+#include <stdio.h>
+#include <time.h>
+
+#define POINTS {len(points)}
+
+static const double in[][{arity}] = {{
+{inputs}
+}};
+static const double expected[][{outputs}] = {{
+{expected}
+}};
+
+int main(void)
+{{
+    int failures = 0;
+    for (int i = 0; i < POINTS; i++) {{
+        {call}
+        for (int k = 0; k < {outputs}; k++) {{
+            double tolerance = 1e-12 + 1e-9 * fabs(expected[i][k]);
+            if (!(fabs(got[k] - expected[i][k]) <= tolerance)) {{
+                printf("self-test FAILED at %.17g: output %d is %.17g, expected %.17g\\n", in[i][0], k, got[k], expected[i][k]);
+                failures++;
+            }}
+        }}
+    }}
+    printf("self-test: %d points, %d failures\\n", POINTS, failures);
+    if (failures || POINTS == 0)
+        return 1;
+
+    const long n = 2000000;
+    volatile double sink = 0.0;
+    struct timespec start, stop;
+    clock_gettime(CLOCK_MONOTONIC, &start);
+    for (long i = 0; i < n; i++) {{
+        double x = in[0][0] + 1e-9 * (double)(i & 1023);
+        {bench_call}
+    }}
+    clock_gettime(CLOCK_MONOTONIC, &stop);
+    double seconds = (stop.tv_sec - start.tv_sec) + (stop.tv_nsec - start.tv_nsec) * 1e-9;
+    printf("benchmark: %.2f ns per call (%ld calls)\\n", seconds / n * 1e9, n);
+    return 0;
+}}
+"""
+
+
+def _python_source(name, arguments, assignments, reduced, numba=False):
+    from sympy.printing.numpy import NumPyPrinter
+
+    printer = NumPyPrinter({"fully_qualified_modules": True})
+    lines = ["import numpy", ""]
+    if numba:
+        lines[0:0] = ["import numba"]
+        lines += ["", "@numba.njit(cache=True)"]
+    else:
+        lines.append("")
+    lines.append(f"def {name}({', '.join(str(a) for a in arguments)}):")
+    for symbol, expr in assignments:
+        lines.append(f"    {symbol} = {printer.doprint(expr)}")
+    if len(reduced) == 2:
+        lines.append(f"    return {printer.doprint(reduced[0])}, {printer.doprint(reduced[1])}")
+    else:
+        lines.append(f"    return {printer.doprint(reduced[0])}")
+    return "\n".join(lines) + "\n"
+
+
+def _python_harness(source, name, arguments, outputs, points, numba=False):
+    inputs = [values for values, _ in points]
+    expected = [values for _, values in points]
+    return f"""{source}
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    inputs = numpy.array({inputs!r}, dtype=float).reshape(-1, {len(arguments)})
+    expected = numpy.array({expected!r}, dtype=float).reshape(-1, {outputs})
+    got = {name}(*inputs.T)
+    # Constant outputs come back as scalars.
+    got = numpy.column_stack([numpy.broadcast_to(g, len(inputs)) for g in (got if {outputs} == 2 else [got])])
+    bad = ~(numpy.abs(got - expected) <= 1e-12 + 1e-9 * numpy.abs(expected))
+    for i, k in zip(*numpy.nonzero(bad)):
+        print(f"self-test FAILED at {{inputs[i, 0]!r}}: output {{k}} is {{got[i, k]!r}}, expected {{expected[i, k]!r}}")
+    print(f"self-test: {{len(inputs)}} points, {{int(bad.sum())}} failures")
+    if bad.any() or not len(inputs):
+        sys.exit(1)
+
+    x = numpy.linspace(inputs[0, 0], inputs[0, 0] + 1e-3, 1_000_000)
+    rest = inputs[0, 1:]
+    {name}(x[:10], *rest){"  # compile" if numba else ""}
+    start = time.perf_counter()
+    {name}(x, *rest)
+    seconds = time.perf_counter() - start
+    print(f"benchmark: {{seconds / len(x) * 1e9:.2f}} ns per element ({{len(x)}} elements)")
+"""
@@ -0,0 +1,399 @@
+#Headless derivative engine. Nothing in here imports tkinter, so batch jobs,
+#tests and workers can use the calculators without a display.
+
+from dataclasses import dataclass, replace
+
+import sympy as sp
+
+from . import canonical, instrument, limits, parser
+from .cache import LRUCache
+from .result_cache import ResultCache
+from .rules import differentiate
+from .simplify import quotient_forms, simplify_expression, timeout_count
+from .steps import Steps
+
+ENGINE_VERSION = "7"
+
+CHAIN_RULE = "Chain Rule"
+QUOTIENT_RULE = "Quotient Rule"
+MODES = (CHAIN_RULE, QUOTIENT_RULE)
+
+
+@dataclass(frozen=True)
+class DerivativeResult:
+    mode: str
+    result: sp.Expr
+    # Formatted only when shown or exported; see chain_rule.steps.
+    steps: Steps
+    variable: str = "x"
+    # The function that was differentiated: f(g(x)) or num/denom.
+    function: sp.Expr | None = None
+
+    # Lets callers keep writing `result, steps = chain_rule_calculator(...)`.
+    def __iter__(self):
+        yield self.result
+        yield self.steps
+
+    def numeric(self):
+        # Vectorized NumPy callable for the derivative; see chain_rule.numeric.
+        from .numeric import compile_expression
+        return compile_expression(self.result, self.variable)
+
+    def verify(self, **options):
+        # Numeric spot check against a finite difference of `function`; see
+        # chain_rule.verify.verify_result for the options.
+        from .verify import verify_result
+        return verify_result(self, **options)
+
+    def cross_check(self, **options):
+        # Tighter check against forward-mode AD of `function`; see
+        # chain_rule.forward.cross_check for the options.
+        from .forward import cross_check
+        return cross_check(self, **options)
+
+
+def _expression_weight(key, expr):
+    # Key length plus tree size, so a few huge inputs can't crowd out
+    # thousands of small ones without being charged for it.
+    return len(key) + sum(1 for _ in sp.preorder_traversal(expr))
+
+
+parse_cache = LRUCache(max_entries=4096, max_weight=1_000_000, weigh=_expression_weight)
+
+
+def normalize_input(expression):
+    # Spacing is kept (as single spaces): with implicit multiplication, "2 3"
+    # is an error but "23" is a number.
+    return " ".join(expression.split()).replace('^', '**')
+
+
+def validate_input(expression):
+    with instrument.phase("parse"):
+        key = normalize_input(expression)
+        parsed = parse_cache.get(key)
+        if parsed is not None:
+            return parsed
+        limits.check_text(key)
+        try:
+            # The text as typed, so error positions point into it.
+            parsed = parser.parse(expression)
+        except RecursionError:
+            raise limits.ResourceLimitError("max_depth", None, limits.active.max_depth)
+        limits.check_expression(parsed)
+        parse_cache.put(key, parsed)
+        return parsed
+
+
+# Whole results for recently seen problems, keyed on canonical digests (see
+# _cached), so `1+t^2` in t reuses the work done for `x^2+1` in x.
+derivative_cache = LRUCache(max_entries=1024)
+
+_result_cache = None
+
+
+def enable_result_cache(path, **options) -> ResultCache:
+    # Turn on the persistent result cache for every calculator call in this
+    # process. `options` go to ResultCache (max_entries, memory_entries, preload).
+    global _result_cache
+    disable_result_cache()
+    _result_cache = ResultCache(path, **options)
+    return _result_cache
+
+
+def disable_result_cache():
+    global _result_cache
+    if _result_cache is not None:
+        _result_cache.close()
+    _result_cache = None
+
+
+def _cached(mode, first, second, variable, compute):
+    # Parses both inputs, renames the variable to canonical.PLACEHOLDER and
+    # solves the problem in that canonical form, so every cache underneath
+    # (this one, the persistent one, differentiation memos, simplify) is keyed
+    # on the canonical expressions rather than on how they were typed. The
+    # answer is renamed back to the caller's variable at the end.
+    x = _chain_variables(variable)[0] if mode == CHAIN_RULE else sp.symbols(variable)
+    first_expr, first_digest = canonical.canonicalize(validate_input(first), x)
+    second_expr, second_digest = canonical.canonicalize(validate_input(second), x)
+    key = (mode, first_digest, second_digest, canonical.PLACEHOLDER_NAME, ENGINE_VERSION)
+
+    solved = derivative_cache.get(key)
+    if solved is None and _result_cache is not None:
+        stored = _result_cache.get(key)
+        if stored is not None:
+            # Only the derivative and steps are stored; the original function
+            # is cheap to rebuild from the inputs.
+            function = _function(mode, first_expr, second_expr)
+            solved = DerivativeResult(mode, *stored, canonical.PLACEHOLDER_NAME, function)
+    if solved is None:
+        timeouts = timeout_count()
+        solved = compute(first_expr, second_expr, canonical.PLACEHOLDER)
+        # A simplification the time limit cut short may do better next time.
+        if timeout_count() == timeouts:
+            if _result_cache is not None:
+                _result_cache.put(key, solved.result, solved.steps)
+            derivative_cache.put(key, solved)
+    else:
+        derivative_cache.put(key, solved)
+
+    return DerivativeResult(
+        mode,
+        canonical.restore(solved.result, x),
+        solved.steps.map(lambda expr: canonical.restore(expr, x), lambda text: canonical.restore_text(text, x)),
+        str(x),
+        canonical.restore(solved.function, x),
+    )
+
+
+def _function(mode, first, second):
+    if mode == CHAIN_RULE:
+        return second.subs(sp.Symbol('u'), first)
+    return first / second
+
+
+def chain_rule_calculator(inner_func, outer_func, variable) -> DerivativeResult:
+    with instrument.trace("chain_rule_calculator", mode=CHAIN_RULE):
+        return _cached(CHAIN_RULE, inner_func, outer_func, variable, _chain_rule)
+
+
+def _chain_variables(variable):
+    x = sp.symbols(variable)
+    u = sp.Symbol('u')
+    if x == u:
+        raise ValueError("'u' is reserved for the outer function; use another variable name.")
+    return x, u
+
+
+# Shown in the steps of a preview, in place of the simplified result.
+PENDING_SIMPLIFY = "(simplifying...)"
+
+# chain_rule_grid's simplify options.
+GRID_SIMPLIFY = ("factors", "each", None)
+
+
+def _chain_rule(inner, outer, x, simplify=True, memos=None):
+    # `memos` is an (inner, outer) pair of differentiation memos to share
+    # across calls; see chain_rule_grid.
+    u = sp.Symbol('u')
+    inner_memo, outer_memo = memos or ({}, {})
+
+    instrument.record_size("inner", inner)
+    instrument.record_size("outer", outer)
+
+    with instrument.phase("diff"):
+        inner_derivative = differentiate(inner, x, inner_memo)
+        outer_derivative = differentiate(outer, u, outer_memo)
+
+    with instrument.phase("subs"):
+        substituted = outer_derivative.subs(u, inner)
+        result = substituted * inner_derivative
+    instrument.record_size("result", result)
+
+    if not simplify:
+        steps = _chain_steps(
+            x, inner, outer, inner_derivative, outer_derivative, substituted, ("7. Simplify: ", PENDING_SIMPLIFY),
+        )
+        return DerivativeResult(CHAIN_RULE, result, steps, str(x), _function(CHAIN_RULE, inner, outer))
+
+    with instrument.phase("simplify"):
+        simplified = simplify_expression(result)
+    instrument.record_size("simplified", simplified)
+
+    with instrument.phase("steps"):
+        steps = _chain_steps(
+            x, inner, outer, inner_derivative, outer_derivative, substituted, ("7. Simplify: ", simplified),
+        )
+    return DerivativeResult(CHAIN_RULE, simplified, steps, str(x), _function(CHAIN_RULE, inner, outer))
+
+
+def _chain_steps(x, inner, outer, inner_derivative, outer_derivative, substituted, final):
+    # `final` is the last line, which says what became of the product.
+    return Steps.of(
+        "Step-by-step solution (Chain Rule):",
+        "",
+        ("1. Let g(", x, ") = ", inner),
+        ("2. Let f(u) = ", outer),
+        ("3. Compute g'(", x, ") = ", inner_derivative),
+        ("4. Compute f'(u) = ", outer_derivative),
+        ("5. Substitute u = g(", x, ") into f'(u): f'(g(", x, ")) = ", substituted),
+        ("6. Multiply by g'(", x, "): ", substituted, " * ", inner_derivative),
+        final,
+    )
+
+
+def chain_rule_grid(inners, outers, variable, simplify="factors"):
+    # Every inner against every outer, row by row, as a stream of
+    # (i, j, DerivativeResult). All inputs are parsed before the first result,
+    # so a bad one fails fast. Differentiation memos are shared by the whole
+    # grid, so each g' and f' is worked out once however many pairs it is in.
+    #
+    # simplify="factors" also simplifies each g' and f' once and leaves each
+    # pair as the product f'(g(x)) * g'(x): a 50x50 grid costs about 100
+    # derivatives. "each" simplifies every pair, giving exactly what
+    # chain_rule_calculator would (and sharing its cache). None skips
+    # simplification altogether, like preview_derivative.
+    if simplify not in GRID_SIMPLIFY:
+        raise ValueError(f"Unknown simplify option {simplify!r}; expected one of {', '.join(map(repr, GRID_SIMPLIFY))}.")
+    x, u = _chain_variables(variable)
+    inners, outers = list(inners), list(outers)
+    parsed_inners = [validate_input(inner) for inner in inners]
+    parsed_outers = [validate_input(outer) for outer in outers]
+    memos = ({}, {})
+
+    if simplify == "each":
+        def compute(inner, outer, placeholder):
+            return _chain_rule(inner, outer, placeholder, memos=memos)
+
+        for i, inner in enumerate(inners):
+            for j, outer in enumerate(outers):
+                with instrument.trace("chain_rule_grid", mode=CHAIN_RULE):
+                    result = _cached(CHAIN_RULE, inner, outer, variable, compute)
+                yield i, j, result
+        return
+
+    # The product f'(g(x)) * g'(x) is never simplified here, so the last step
+    # says so rather than claiming a simplification.
+    prepare = simplify_expression if simplify == "factors" else (lambda expr: expr)
+    # f'(u) for each outer, worked out once, on first use.
+    outer_derivatives = {}
+    for i, inner in enumerate(parsed_inners):
+        with instrument.trace("chain_rule_grid", mode=CHAIN_RULE):
+            inner_derivative = prepare(differentiate(inner, x, memos[0]))
+        for j, outer in enumerate(parsed_outers):
+            with instrument.trace("chain_rule_grid", mode=CHAIN_RULE):
+                if j not in outer_derivatives:
+                    outer_derivatives[j] = prepare(differentiate(outer, u, memos[1]))
+                outer_derivative = outer_derivatives[j]
+                substituted = outer_derivative.subs(u, inner)
+                result = substituted * inner_derivative
+                steps = _chain_steps(
+                    x, inner, outer, inner_derivative, outer_derivative, substituted,
+                    ("7. Result (product not simplified): ", result),
+                )
+            yield i, j, DerivativeResult(CHAIN_RULE, result, steps, str(x), _function(CHAIN_RULE, inner, outer))
+
+
+def chain_rule_fan_out(inner, outers, variable, simplify="factors"):
+    # One inner against many outers: yields a DerivativeResult per outer, in
+    # order. For one outer against many inners, use chain_rule_grid(inners,
+    # [outer], ...).
+    for _, _, result in chain_rule_grid([inner], outers, variable, simplify):
+        yield result
+
+
+def nested_chain_rule_calculator(layers, variable) -> DerivativeResult:
+    # Chain rule through any number of layers, innermost first: layers[0] is
+    # written in the variable, every later layer in u. ["x^2", "sin(u)",
+    # "exp(u)"] is exp(sin(x^2)).
+    if not layers:
+        raise ValueError("Give at least one function to differentiate.")
+    x, u = _chain_variables(variable)
+    parsed = [validate_input(layer) for layer in layers]
+
+    # Shared memo: a subexpression that shows up in several layers is only
+    # differentiated once per variable.
+    memo = {}
+    derivatives = [differentiate(parsed[0], x, memo)]
+    derivatives += [differentiate(layer, u, memo) for layer in parsed[1:]]
+
+    # values[k] is layer k applied to everything beneath it; each is built
+    # from the one below, so no layer is substituted twice.
+    values = [parsed[0]]
+    for layer in parsed[1:]:
+        values.append(layer.subs(u, values[-1]))
+
+    factors = [derivatives[0]]
+    factors += [derivative.subs(u, below) for derivative, below in zip(derivatives[1:], values)]
+    result = sp.Mul(*factors)
+    simplified = simplify_expression(result)
+
+    names = [f"g{i + 1}" for i in range(len(layers))]
+    lines = [f"Step-by-step solution (Chain Rule, {len(layers)} layers):", ""]
+    lines.append((f"1. Let {names[0]}(", x, ") = ", parsed[0]))
+    lines += [(f"   Let {name}(u) = ", layer) for name, layer in zip(names[1:], parsed[1:])]
+    lines.append((f"2. Compute {names[0]}'(", x, ") = ", derivatives[0]))
+    lines += [(f"   Compute {name}'(u) = ", derivative) for name, derivative in zip(names[1:], derivatives[1:])]
+    lines.append("3. Evaluate each derivative at the layer beneath it:")
+    lines += [(f"   {name}'(...) = ", factor) for name, factor in zip(names[1:], factors[1:])]
+    product = ["4. Multiply: "]
+    for factor in reversed(factors):
+        product += [" * (" if len(product) > 1 else "(", factor, ")"]
+    lines.append(product)
+    lines.append(("5. Simplify: ", simplified))
+    return DerivativeResult(CHAIN_RULE, simplified, Steps.of(*lines), str(x), values[-1])
+
+
+def quotient_rule_calculator(numerator, denominator, variable) -> DerivativeResult:
+    with instrument.trace("quotient_rule_calculator", mode=QUOTIENT_RULE):
+        return _cached(QUOTIENT_RULE, numerator, denominator, variable, _quotient_rule)
+
+
+def _quotient_derivative(num, denom, x):
+    with instrument.phase("diff"):
+        memo = {}
+        num_derivative = differentiate(num, x, memo)
+        denom_derivative = differentiate(denom, x, memo)
+        result = (num_derivative * denom - num * denom_derivative) / denom**2
+    return num_derivative, denom_derivative, result
+
+
+def _quotient_rule(num, denom, x, simplify=True):
+    instrument.record_size("numerator", num)
+    instrument.record_size("denominator", denom)
+
+    num_derivative, denom_derivative, result = _quotient_derivative(num, denom, x)
+    instrument.record_size("result", result)
+
+    if simplify:
+        # The cheapest of several forms rather than whatever sp.simplify
+        # makes of it; result_forms returns the others.
+        with instrument.phase("simplify"):
+            best = quotient_forms(result, x)[0]
+            simplified = best.expr
+        instrument.record_size("simplified", simplified)
+
+    with instrument.phase("steps"):
+        steps = Steps.of(
+            "Step-by-step solution (Quotient Rule):",
+            "",
+            ("1. Let u(", x, ") = ", num, ", v(", x, ") = ", denom),
+            ("2. Compute u'(", x, ") = ", num_derivative, ", v'(", x, ") = ", denom_derivative),
+            "3. Apply the quotient rule:",
+            ("   (u' * v - u * v') / v^2 = (", num_derivative, " * ", denom, " - ", num, " * ", denom_derivative, ") / (", denom, ")^2"),
+            (f"4. Simplify ({best.name} form): ", simplified) if simplify else ("4. Simplify: ", PENDING_SIMPLIFY),
+        )
+    return DerivativeResult(QUOTIENT_RULE, simplified if simplify else result, steps, str(x), _function(QUOTIENT_RULE, num, denom))
+
+
+def result_forms(numerator, denominator, variable) -> tuple:
+    # Every candidate form of the quotient-rule derivative that fit in the
+    # simplify budget (simplify.Form), cheapest first. The calculators return
+    # the first; this is for callers that want, say, partial fractions.
+    x = sp.symbols(variable)
+    with instrument.trace("result_forms", mode=QUOTIENT_RULE):
+        num, _ = canonical.canonicalize(validate_input(numerator), x)
+        denom, _ = canonical.canonicalize(validate_input(denominator), x)
+        result = _quotient_derivative(num, denom, canonical.PLACEHOLDER)[2]
+        forms = quotient_forms(result, canonical.PLACEHOLDER)
+    return tuple(replace(form, expr=canonical.restore(form.expr, x)) for form in forms)
+
+
+def preview_derivative(mode, first, second, variable) -> DerivativeResult:
+    # The derivative straight out of the rule, without simplify: cheap enough
+    # to show while the full result is still being worked out.
+    if mode == CHAIN_RULE:
+        return _chain_rule(validate_input(first), validate_input(second), _chain_variables(variable)[0], simplify=False)
+    if mode == QUOTIENT_RULE:
+        return _quotient_rule(validate_input(first), validate_input(second), sp.symbols(variable), simplify=False)
+    raise ValueError(f"Unknown mode {mode!r}; expected one of {', '.join(MODES)}.")
+
+
+def compute_derivative(mode, first, second, variable) -> DerivativeResult:
+    # `first`/`second` are inner/outer in Chain Rule mode and
+    # numerator/denominator in Quotient Rule mode, matching the GUI fields.
+    if mode == CHAIN_RULE:
+        return chain_rule_calculator(first, second, variable)
+    if mode == QUOTIENT_RULE:
+        return quotient_rule_calculator(first, second, variable)
+    raise ValueError(f"Unknown mode {mode!r}; expected one of {', '.join(MODES)}.")
@@ -0,0 +1,222 @@
+#Forward-mode automatic differentiation: derivative values at points without
+#building the symbolic derivative. Needs NumPy, like chain_rule.numeric, so
+#import this module explicitly:
+#    from chain_rule.forward import forward_derivative
+#
+#A parsed expression is compiled once into a tape, one entry per distinct
+#subexpression in evaluation order. Evaluating the tape pushes a dual number
+#(value, derivative) through each entry, vectorized over NumPy arrays, so the
+#cost is linear in the size of the expression however badly its symbolic
+#derivative would expand. The chain and quotient rules are then applied to
+#the values: f is evaluated at the dual number g produced.
+
+import time
+
+import numpy as np
+import sympy as sp
+
+from .cache import LRUCache
+from .engine import CHAIN_RULE, MODES, QUOTIENT_RULE, validate_input
+
+# sympy function -> (value, derivative of the value given argument a and value v)
+_FUNCTIONS = {
+    sp.sin: (np.sin, lambda a, v: np.cos(a)),
+    sp.cos: (np.cos, lambda a, v: -np.sin(a)),
+    sp.tan: (np.tan, lambda a, v: 1 + v * v),
+    sp.cot: (lambda a: 1 / np.tan(a), lambda a, v: -(1 + v * v)),
+    sp.sec: (lambda a: 1 / np.cos(a), lambda a, v: v * np.tan(a)),
+    sp.csc: (lambda a: 1 / np.sin(a), lambda a, v: -v / np.tan(a)),
+    sp.asin: (np.arcsin, lambda a, v: 1 / np.sqrt(1 - a * a)),
+    sp.acos: (np.arccos, lambda a, v: -1 / np.sqrt(1 - a * a)),
+    sp.atan: (np.arctan, lambda a, v: 1 / (1 + a * a)),
+    sp.sinh: (np.sinh, lambda a, v: np.cosh(a)),
+    sp.cosh: (np.cosh, lambda a, v: np.sinh(a)),
+    sp.tanh: (np.tanh, lambda a, v: 1 - v * v),
+    sp.exp: (np.exp, lambda a, v: v),
+    sp.log: (np.log, lambda a, v: 1 / a),
+    sp.Abs: (np.abs, lambda a, v: np.sign(a)),
+}
+
+# Points per pass through the tape.
+CHUNK_SIZE = 4096
+
+# (expr, variable) -> compiled evaluator
+tape_cache = LRUCache(max_entries=512)
+
+
+def _constant(node):
+    value = complex(node.evalf())
+    if value.imag:
+        raise ValueError(f"Cannot evaluate numerically: {node} is not real.")
+    return value.real
+
+
+def _compile_tape(expr, x):
+    # Returns (tape, slots): tape entries are (kind, argument slots, payload),
+    # in an order where every entry comes after its arguments; slots maps each
+    # subexpression to its entry. Constant subtrees are folded into one entry.
+    slots = {}
+    tape = []
+    stack = [(expr, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if node in slots:
+            continue
+        if node == x:
+            entry = ("variable", (), None)
+        elif not node.free_symbols:
+            entry = ("constant", (), _constant(node))
+        elif node.is_Symbol:
+            raise ValueError(f"Cannot evaluate numerically: unknown symbol {node}.")
+        elif not expanded:
+            stack.append((node, True))
+            stack.extend((arg, False) for arg in node.args)
+            continue
+        elif node.is_Pow and not node.exp.free_symbols:
+            # Integer exponents stay integers: NumPy squares and multiplies
+            # for those instead of calling pow().
+            exponent = int(node.exp) if node.exp.is_Integer else _constant(node.exp)
+            entry = ("power", (slots[node.base],), exponent)
+        elif node.is_Add or node.is_Mul or node.is_Pow:
+            entry = (type(node).__name__.lower(), tuple(slots[arg] for arg in node.args), None)
+        elif node.func in _FUNCTIONS and len(node.args) == 1:
+            entry = ("function", (slots[node.args[0]],), _FUNCTIONS[node.func])
+        else:
+            raise ValueError(f"Cannot differentiate numerically: unsupported function {node.func}.")
+        slots[node] = len(tape)
+        tape.append(entry)
+    return tape, slots[expr]
+
+
+def _run(tape, output, value, derivative):
+    # A derivative of None means "known to be zero", which saves the work for
+    # every constant subtree.
+    values = [None] * len(tape)
+    derivatives = [None] * len(tape)
+    for index, (kind, args, payload) in enumerate(tape):
+        if kind == "variable":
+            v, d = value, derivative
+        elif kind == "constant":
+            v, d = payload, None
+        elif kind == "add":
+            v = values[args[0]]
+            d = derivatives[args[0]]
+            for arg in args[1:]:
+                v = v + values[arg]
+                if derivatives[arg] is not None:
+                    d = derivatives[arg] if d is None else d + derivatives[arg]
+        elif kind == "mul":
+            v = values[args[0]]
+            d = derivatives[args[0]]
+            for arg in args[1:]:
+                w, dw = values[arg], derivatives[arg]
+                # (v*w)' = v'w + vw', one factor at a time.
+                d = None if d is None else d * w
+                if dw is not None:
+                    d = v * dw if d is None else d + v * dw
+                v = v * w
+        elif kind == "power":
+            a, da = values[args[0]], derivatives[args[0]]
+            v = a ** payload
+            d = None if da is None else payload * a ** (payload - 1) * da
+        elif kind == "pow":
+            a, da = values[args[0]], derivatives[args[0]]
+            b, db = values[args[1]], derivatives[args[1]]
+            v = a ** b
+            # (a^b)' = a^b * (b' log a + b a'/a)
+            d = 0
+            if db is not None:
+                d = d + db * np.log(a)
+            if da is not None:
+                d = d + b * da / a
+            d = v * d
+        else:
+            function, slope = payload
+            a, da = values[args[0]], derivatives[args[0]]
+            v = function(a)
+            d = None if da is None else slope(a, v) * da
+        values[index] = v
+        derivatives[index] = d
+    return values[output], derivatives[output]
+
+
+def compile_dual(expr, variable="x"):
+    # Returns evaluate(value, derivative=1.0) -> (values, derivatives), both
+    # arrays: expr at `value` and its derivative pushed forward from the input
+    # derivative. With the default seed that is d(expr)/d(variable); pass
+    # g(x) and g'(x) to get the chain rule's f(g(x)) and f'(g(x)) g'(x).
+    x = sp.Symbol(variable) if isinstance(variable, str) else variable
+    key = (expr, x)
+    compiled = tape_cache.get(key)
+    if compiled is not None:
+        return compiled
+    tape, output = _compile_tape(expr, x)
+
+    def compiled(value, derivative=1.0):
+        shape = np.broadcast_shapes(np.shape(value), np.shape(derivative))
+        value = np.broadcast_to(np.asarray(value, dtype=float), shape).reshape(-1)
+        derivative = np.broadcast_to(np.asarray(derivative, dtype=float), shape).reshape(-1)
+        values = np.empty(value.size)
+        derivatives = np.empty(value.size)
+        # In chunks, so the tape's intermediate arrays stay in cache rather
+        # than each being as long as the input.
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            for start in range(0, value.size, CHUNK_SIZE):
+                stop = start + CHUNK_SIZE
+                v, d = _run(tape, output, value[start:stop], derivative[start:stop])
+                # Constant parts come back as scalars and zero derivatives
+                # as None.
+                values[start:stop] = v
+                derivatives[start:stop] = 0.0 if d is None else d
+        return values.reshape(shape), derivatives.reshape(shape)
+
+    tape_cache.put(key, compiled)
+    return compiled
+
+
+def forward_derivative(mode, first, second, points, variable="x"):
+    # The function and derivative values at `points` for a calculator problem,
+    # with no symbolic differentiation. Returns (values, derivatives).
+    # `first`/`second` are text (parsed under the input limits) or already
+    # parsed expressions.
+    points = np.asarray(points, dtype=float)
+    first_expr = first if isinstance(first, sp.Basic) else validate_input(first)
+    second_expr = second if isinstance(second, sp.Basic) else validate_input(second)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        if mode == CHAIN_RULE:
+            inner, inner_derivative = compile_dual(first_expr, variable)(points)
+            return compile_dual(second_expr, "u")(inner, inner_derivative)
+        if mode == QUOTIENT_RULE:
+            num, num_derivative = compile_dual(first_expr, variable)(points)
+            denom, denom_derivative = compile_dual(second_expr, variable)(points)
+            return num / denom, (num_derivative * denom - num * denom_derivative) / denom**2
+    raise ValueError(f"Unknown mode {mode!r}; expected one of {', '.join(MODES)}.")
+
+
+def cross_check(result, samples=64, low=-5.0, high=5.0, rtol=1e-9, atol=1e-12, min_points=8, seed=0):
+    # Compares a symbolic DerivativeResult with forward-mode values of its
+    # original function. Both are exact up to rounding, so the tolerances are
+    # much tighter than verify's finite differences can afford. Returns a
+    # verify.VerificationResult.
+    from .numeric import compile_expression
+    from .verify import VerificationResult
+
+    if result.function is None:
+        raise ValueError("This result doesn't carry its original function, so it can't be cross-checked.")
+    started = time.perf_counter()
+    points = np.random.default_rng(seed).uniform(low, high, samples)
+    _, forward = compile_dual(result.function, result.variable)(points)
+    with np.errstate(all="ignore"):
+        symbolic = compile_expression(result.result, result.variable)(points)
+        error = np.abs(symbolic - forward)
+        usable = np.isfinite(forward) & np.isfinite(symbolic)
+        bad = usable & (error > atol + rtol * np.abs(forward))
+    checked = int(usable.sum())
+    return VerificationResult(
+        passed=None if checked < min_points else not bad.any(),
+        checked=checked,
+        skipped=samples - checked,
+        max_error=float(error[usable].max()) if checked else 0.0,
+        counterexample=float(points[bad][0]) if bad.any() else None,
+        elapsed_ms=(time.perf_counter() - started) * 1000,
+    )
@@ -0,0 +1,136 @@
+#Higher-order derivatives, gradients, Jacobians and Hessians on top of the
+#chain and quotient calculators.
+#
+#The first derivative comes from the calculator for the mode (so it keeps its
+#rule-by-rule steps); every later order differentiates the simplified result
+#of the order below it, which is cached. Partials are cached under the sorted
+#list of variables: for the smooth functions the parser produces, mixed
+#partials don't depend on the order of differentiation, so d2f/dxdy and
+#d2f/dydx are one entry and a Hessian only computes its upper triangle.
+
+from dataclasses import dataclass
+from functools import cached_property
+
+import sympy as sp
+
+from . import instrument
+from .cache import LRUCache
+from .engine import compute_derivative, validate_input
+from .rules import differentiate
+from .simplify import simplify_expression, timeout_count
+from .steps import Steps
+
+# (mode, first, second, sorted variable names) -> Partial
+partial_cache = LRUCache(max_entries=4096)
+
+
+@dataclass(frozen=True, eq=False)
+class Partial:
+    mode: str
+    # The variables differentiated by, in the order they were applied.
+    variables: tuple
+    result: sp.Expr
+    # Order 1: the calculator's DerivativeResult. Higher orders: the partial
+    # this one was differentiated from, and the unsimplified derivative.
+    first: object = None
+    previous: "Partial | None" = None
+    raw: sp.Expr | None = None
+
+    @property
+    def order(self):
+        return len(self.variables)
+
+    @property
+    def label(self):
+        return _label(self.variables)
+
+    @cached_property
+    def steps(self):
+        # Built on first access and kept, so asking for the 4th order's steps
+        # formats each lower order once, and never formats unused ones.
+        if self.previous is None:
+            return self.first.steps
+        return self.previous.steps + Steps.of(
+            "",
+            (f"Order {self.order}: differentiate {self.previous.label} = ", self.previous.result,
+             f" with respect to {self.variables[-1]}:"),
+            (f"   {self.label} = ", self.raw),
+            ("   Simplify: ", self.result),
+        )
+
+
+def _label(variables):
+    order = len(variables)
+    if len(set(variables)) == 1:
+        if order == 1:
+            return f"df/d{variables[0]}"
+        return f"d^{order}f/d{variables[0]}^{order}"
+    return f"d^{order}f/" + "".join(f"d{v}" for v in variables)
+
+
+def _variable_names(variables):
+    if isinstance(variables, str):
+        variables = variables.replace(",", " ").split()
+    names = tuple(str(v).strip() for v in variables)
+    if not names or not all(names):
+        raise ValueError("Give at least one variable.")
+    return names
+
+
+def partial(mode, first, second, variables) -> Partial:
+    # Partial derivative of the problem by each of `variables` in turn, e.g.
+    # ("x", "x", "y"). Every lower-order partial on the way is cached too.
+    names = tuple(sorted(_variable_names(variables)))
+    with instrument.trace("partial", mode=mode, order=len(names)):
+        return _partial(mode, first, second, names)
+
+
+def _partial(mode, first, second, names):
+    # Parsed inputs in the key, so `x^2+1` and `1 + x**2` share entries.
+    key = (mode, validate_input(first), validate_input(second), names)
+    cached = partial_cache.get(key)
+    if cached is not None:
+        return cached
+    timeouts = timeout_count()
+    if len(names) == 1:
+        solved = compute_derivative(mode, first, second, names[0])
+        found = Partial(mode, names, solved.result, first=solved)
+    else:
+        previous = _partial(mode, first, second, names[:-1])
+        with instrument.phase("diff"):
+            raw = differentiate(previous.result, sp.Symbol(names[-1]))
+        with instrument.phase("simplify"):
+            simplified = simplify_expression(raw)
+        found = Partial(mode, names, simplified, previous=previous, raw=raw)
+    if timeout_count() == timeouts:
+        partial_cache.put(key, found)
+    return found
+
+
+def nth_derivative(mode, first, second, variable, order) -> tuple:
+    # Orders 1..order, lowest first; each is built from the one before.
+    if order < 1:
+        raise ValueError("The order must be at least 1.")
+    name = _variable_names([variable])[0]
+    return tuple(partial(mode, first, second, [name] * k) for k in range(1, order + 1))
+
+
+def gradient(mode, first, second, variables) -> tuple:
+    return tuple(partial(mode, first, second, [name]) for name in _variable_names(variables))
+
+
+def jacobian(mode, problems, variables) -> tuple:
+    # One row per (first, second) problem, one column per variable.
+    names = _variable_names(variables)
+    return tuple(gradient(mode, first, second, names) for first, second in problems)
+
+
+def hessian(mode, first, second, variables) -> tuple:
+    # Only the upper triangle is computed; the lower one holds the same
+    # Partial objects.
+    names = _variable_names(variables)
+    rows = [[None] * len(names) for _ in names]
+    for i, a in enumerate(names):
+        for j in range(i, len(names)):
+            rows[i][j] = rows[j][i] = partial(mode, first, second, [a, names[j]])
+    return tuple(tuple(row) for row in rows)
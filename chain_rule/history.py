@@ -0,0 +1,117 @@
+#Result history for the GUI. The newest `max_entries` results live in an
+#in-memory ring buffer; older ones are appended to a spill file on disk and
+#read back on demand, so the history can grow without memory climbing. Only
+#the byte offset of each spilled entry stays in memory.
+#
+#Entries are addressed 0 (oldest) .. len(history) - 1 (newest) whether they
+#are in memory or spilled.
+
+import tempfile
+from array import array
+from collections import deque
+
+DEFAULT_MAX_ENTRIES = 200
+
+
+class HistoryBuffer:
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, spill_path=None):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1.")
+        self.max_entries = max_entries
+        self.spill_path = spill_path
+        self._recent = deque()
+        self._offsets = array("q")
+        self._spill = None
+
+    def __len__(self):
+        return len(self._offsets) + len(self._recent)
+
+    @property
+    def spilled(self):
+        return len(self._offsets)
+
+    def append(self, text):
+        self._recent.append(text)
+        if len(self._recent) > self.max_entries:
+            self._spill_entry(self._recent.popleft())
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("history index out of range")
+        if index >= len(self._offsets):
+            return self._recent[index - len(self._offsets)]
+        return self._read_spilled(index)
+
+    def window(self, start, count):
+        # Entries start .. start+count-1, clipped to what exists. This is what
+        # the list widget asks for; spilled entries are read in one seek.
+        start = max(0, start)
+        stop = min(len(self), start + count)
+        if start >= stop:
+            return []
+        rows = []
+        if start < len(self._offsets):
+            rows += self._read_spilled_range(start, min(stop, len(self._offsets)))
+        first_recent = max(start, len(self._offsets)) - len(self._offsets)
+        for i in range(first_recent, stop - len(self._offsets)):
+            rows.append(self._recent[i])
+        return rows
+
+    def __iter__(self):
+        for start in range(0, len(self), self.max_entries):
+            yield from self.window(start, self.max_entries)
+
+    def clear(self):
+        self._recent.clear()
+        self._offsets = array("q")
+        if self._spill is not None:
+            self._spill.seek(0)
+            self._spill.truncate()
+
+    def close(self):
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+        self._recent.clear()
+        self._offsets = array("q")
+
+    def _open_spill(self):
+        if self._spill is None:
+            if self.spill_path is None:
+                self._spill = tempfile.TemporaryFile(prefix="chain_rule_history_")
+            else:
+                self._spill = open(self.spill_path, "w+b")
+        return self._spill
+
+    def _spill_entry(self, text):
+        spill = self._open_spill()
+        spill.seek(0, 2)
+        self._offsets.append(spill.tell())
+        # One entry per line; results never contain newlines, but escape them
+        # anyway so a stray one can't shift every later entry.
+        spill.write(text.replace("\\", "\\\\").replace("\n", "\\n").encode("utf-8") + b"\n")
+
+    def _read_spilled(self, index):
+        return self._read_spilled_range(index, index + 1)[0]
+
+    def _read_spilled_range(self, start, stop):
+        spill = self._spill
+        spill.flush()
+        spill.seek(self._offsets[start])
+        end = self._offsets[stop] if stop < len(self._offsets) else None
+        data = spill.read() if end is None else spill.read(end - self._offsets[start])
+        return [_unescape(line.decode("utf-8")) for line in data.split(b"\n")[:stop - start]]
+
+
+def _unescape(text):
+    out = []
+    chars = iter(text)
+    for char in chars:
+        if char == "\\":
+            char = next(chars, "")
+            out.append("\n" if char == "n" else char)
+        else:
+            out.append(char)
+    return "".join(out)
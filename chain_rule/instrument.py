@@ -0,0 +1,161 @@
+#Opt-in timing instrumentation. When it is off (the default) every hook is a
+#single flag check. Turn it on with configure() or the CHAIN_RULE_PROFILE
+#environment variable, e.g. CHAIN_RULE_PROFILE=1 or CHAIN_RULE_PROFILE=profile,memory.
+#
+#Each top-level call opens a Trace; phases inside it (parse, diff, subs,
+#simplify, steps, ...) add wall and CPU time to it, and the finished trace is
+#logged as one JSON line on the "chain_rule.timing" logger.
+
+import contextvars
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+log = logging.getLogger("chain_rule.timing")
+
+
+@dataclass(frozen=True)
+class Settings:
+    enabled: bool = False
+    # Capture a cProfile of each trace (top functions by cumulative time).
+    profile: bool = False
+    # Track peak Python memory per trace with tracemalloc.
+    memory: bool = False
+
+
+def _settings_from_env():
+    value = os.environ.get("CHAIN_RULE_PROFILE", "").strip().lower()
+    if value in ("", "0", "false", "off"):
+        return Settings()
+    flags = {flag.strip() for flag in value.split(",")}
+    return Settings(enabled=True, profile="profile" in flags, memory="memory" in flags)
+
+
+settings = _settings_from_env()
+
+
+def configure(enabled=True, profile=False, memory=False):
+    global settings
+    settings = Settings(enabled, profile, memory)
+
+
+@dataclass
+class Trace:
+    name: str
+    fields: dict = field(default_factory=dict)
+    # name -> {"wall_ms", "cpu_ms", "calls"}
+    phases: dict = field(default_factory=dict)
+    # name -> count_ops of the expression
+    sizes: dict = field(default_factory=dict)
+    wall_ms: float = 0.0
+    cpu_ms: float = 0.0
+    peak_memory_kb: float | None = None
+    profile: str | None = None
+
+    def add_phase(self, name, wall, cpu):
+        entry = self.phases.setdefault(name, {"wall_ms": 0.0, "cpu_ms": 0.0, "calls": 0})
+        entry["wall_ms"] += wall * 1000
+        entry["cpu_ms"] += cpu * 1000
+        entry["calls"] += 1
+
+    def to_dict(self):
+        data = {"trace": self.name, **self.fields, "wall_ms": round(self.wall_ms, 3), "cpu_ms": round(self.cpu_ms, 3)}
+        data["phases"] = {
+            name: {key: round(value, 3) for key, value in entry.items()}
+            for name, entry in self.phases.items()
+        }
+        data["sizes"] = self.sizes
+        if self.peak_memory_kb is not None:
+            data["peak_memory_kb"] = round(self.peak_memory_kb, 1)
+        if self.profile is not None:
+            data["profile"] = self.profile
+        return data
+
+    def summary(self):
+        # One line for a status bar: "total 41.2 ms | parse 1.1 | diff 0.4 | ...".
+        parts = [f"total {self.wall_ms:.1f} ms"]
+        parts += [f"{name} {entry['wall_ms']:.1f}" for name, entry in self.phases.items()]
+        return " | ".join(parts)
+
+
+_current = contextvars.ContextVar("chain_rule_trace", default=None)
+
+
+def current_trace():
+    return _current.get()
+
+
+@contextmanager
+def trace(name, **fields):
+    # Opens a trace. When one is already open, nested instrumented calls
+    # just add their phases to the outermost trace.
+    if not settings.enabled:
+        yield None
+        return
+    outer = _current.get()
+    if outer is not None:
+        yield outer
+        return
+
+    current = Trace(name, dict(fields))
+    token = _current.set(current)
+    profiler = cProfile.Profile() if settings.profile else None
+    started_tracemalloc = False
+    if settings.memory:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            started_tracemalloc = True
+        tracemalloc.reset_peak()
+    wall, cpu = time.perf_counter(), time.process_time()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield current
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        current.wall_ms = (time.perf_counter() - wall) * 1000
+        current.cpu_ms = (time.process_time() - cpu) * 1000
+        if settings.memory:
+            current.peak_memory_kb = tracemalloc.get_traced_memory()[1] / 1024
+            if started_tracemalloc:
+                tracemalloc.stop()
+        if profiler is not None:
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(15)
+            current.profile = out.getvalue()
+        _current.reset(token)
+        log.info(json.dumps(current.to_dict()))
+
+
+@contextmanager
+def phase(name):
+    current = _current.get() if settings.enabled else None
+    if current is None:
+        yield
+        return
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        yield
+    finally:
+        current.add_phase(name, time.perf_counter() - wall, time.process_time() - cpu)
+
+
+def record_size(name, expr):
+    # count_ops is not free, so it only runs inside an active trace.
+    current = _current.get() if settings.enabled else None
+    if current is not None:
+        import sympy as sp
+        current.sizes[name] = int(sp.count_ops(expr))
+
+
+def event(name, **fields):
+    if settings.enabled:
+        log.info(json.dumps({"event": name, **fields}))
@@ -0,0 +1,143 @@
+#Resource limits for untrusted input. Size limits are checked when an input is
+#parsed, in whatever process does the parsing; the CPU-time and memory limits
+#are applied inside worker processes, and wall time is enforced by the
+#DerivativeWorker that owns the process. Anything over a limit raises
+#ResourceLimitError, which says which limit was hit and by how much.
+
+import signal
+import threading
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+@dataclass(frozen=True)
+class Limits:
+    # Raw input text, in characters.
+    max_input_chars: int | None = 1000
+    # Size of a parsed input (count_ops) and its nesting depth.
+    max_ops: int | None = 500
+    max_depth: int | None = 60
+    # Largest integer exponent allowed in an input; (x+1)^999999 is tiny to
+    # type and enormous to work with.
+    max_exponent: int | None = 1000
+    # Per job, in worker processes.
+    cpu_seconds: float | None = 20.0
+    wall_seconds: float | None = 30.0
+    # Address-space cap for a whole worker process.
+    memory_mb: int | None = 1024
+
+
+default_limits = Limits()
+active = default_limits
+
+
+def current_limits():
+    return active
+
+
+def configure(limits=None, **changes):
+    # configure(Limits(...)) or configure(max_ops=200, ...). Returns the
+    # limits now in force.
+    global active
+    active = limits if limits is not None else Limits(**{**asdict(active), **changes})
+    return active
+
+
+_LIMIT_NAMES = {
+    "max_input_chars": "input length",
+    "max_ops": "expression size",
+    "max_depth": "nesting depth",
+    "max_exponent": "exponent size",
+    "cpu_seconds": "CPU-time limit",
+    "wall_seconds": "wall-time limit",
+    "memory_mb": "memory limit",
+}
+
+
+class ResourceLimitError(ValueError):
+    # `limit` is a Limits field name; `value` is what was measured, when
+    # known, and `maximum` the limit it exceeded.
+    def __init__(self, limit, value, maximum):
+        self.limit = limit
+        self.value = value
+        self.maximum = maximum
+        measured = f" ({value} > {maximum})" if value is not None else f" ({maximum})"
+        super().__init__(f"Input exceeds the {_LIMIT_NAMES.get(limit, limit)}{measured}; try a smaller problem.")
+
+    def __reduce__(self):
+        return type(self), (self.limit, self.value, self.maximum)
+
+    def to_dict(self):
+        return {"limit": self.limit, "value": self.value, "maximum": self.maximum}
+
+
+def check_text(text, limits=None):
+    # Numeric exponents are checked by the parser as it builds each power.
+    limits = limits or active
+    if limits.max_input_chars is not None and len(text) > limits.max_input_chars:
+        raise ResourceLimitError("max_input_chars", len(text), limits.max_input_chars)
+
+
+def check_expression(expr, limits=None):
+    limits = limits or active
+    import sympy as sp
+
+    depth = 0
+    stack = [(expr, 1)]
+    while stack:
+        node, level = stack.pop()
+        if level > depth:
+            depth = level
+            if limits.max_depth is not None and depth > limits.max_depth:
+                raise ResourceLimitError("max_depth", depth, limits.max_depth)
+        if node.is_Pow and node.exp.is_Integer and limits.max_exponent is not None:
+            if abs(node.exp) > limits.max_exponent:
+                raise ResourceLimitError("max_exponent", abs(int(node.exp)), limits.max_exponent)
+        stack.extend((arg, level + 1) for arg in node.args)
+    if limits.max_ops is not None:
+        ops = sp.count_ops(expr)
+        if ops > limits.max_ops:
+            raise ResourceLimitError("max_ops", int(ops), limits.max_ops)
+
+
+def apply_process_limits(limits=None):
+    # For worker processes only: the cap applies to the whole process.
+    limits = limits or active
+    if resource is None or limits.memory_mb is None:
+        return
+    cap = limits.memory_mb * 1024 * 1024
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        cap = min(cap, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (cap, hard))
+
+
+@contextmanager
+def cpu_limit(seconds):
+    # Interrupts the block once it has used `seconds` of CPU time. Like
+    # simplify's time limit, this needs the main thread of a POSIX process
+    # and is a no-op elsewhere; it uses the profiling timer so it doesn't
+    # clash with simplify's wall-clock one.
+    if (
+        seconds is None
+        or not hasattr(signal, "setitimer")
+        or threading.current_thread() is not threading.main_thread()
+    ):
+        yield
+        return
+
+    def _expire(signum, frame):
+        raise ResourceLimitError("cpu_seconds", None, seconds)
+
+    previous = signal.signal(signal.SIGPROF, _expire)
+    signal.setitimer(signal.ITIMER_PROF, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        signal.signal(signal.SIGPROF, previous)
@@ -0,0 +1,59 @@
+#Fast numeric evaluation of derivative results. Needs NumPy, which the rest of
+#the package does not, so import this module explicitly:
+#    from chain_rule.numeric import compile_expression, evaluate
+
+import numpy as np
+import sympy as sp
+
+from .cache import LRUCache
+
+DEFAULT_CHUNK_SIZE = 1 << 16
+
+compiled_cache = LRUCache(max_entries=512)
+
+
+def compile_expression(expr, variable="x"):
+    # Returns f(points) -> ndarray, vectorized over NumPy arrays and built with
+    # common-subexpression elimination. Compiled once per (expr, variable).
+    x = sp.Symbol(variable) if isinstance(variable, str) else variable
+    key = (expr, x)
+    compiled = compiled_cache.get(key)
+    if compiled is not None:
+        return compiled
+
+    extra = expr.free_symbols - {x}
+    if extra:
+        names = ", ".join(sorted(str(symbol) for symbol in extra))
+        raise ValueError(f"Cannot evaluate numerically: unknown symbols {names}.")
+    raw = sp.lambdify(x, expr, modules="numpy", cse=True)
+
+    def compiled(points):
+        points = np.asarray(points, dtype=float)
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            values = raw(points)
+        # Constant expressions come back as scalars.
+        return np.full(points.shape, values, dtype=float) if np.ndim(values) == 0 else values
+
+    compiled_cache.put(key, compiled)
+    return compiled
+
+
+def evaluate(expr, points, variable="x", chunk_size=DEFAULT_CHUNK_SIZE, out=None):
+    # Evaluates `expr` at every point, `chunk_size` points at a time. `points`
+    # may be any array-like including np.memmap, and `out` may be a
+    # preallocated (or memory-mapped) float array of the same length, so inputs
+    # larger than memory never need to be loaded whole.
+    compiled = compile_expression(expr, variable)
+    points = points if isinstance(points, np.ndarray) else np.asarray(points, dtype=float)
+    if out is None:
+        out = np.empty(points.shape, dtype=float)
+    elif out.shape != points.shape:
+        raise ValueError(f"`out` has shape {out.shape}, expected {points.shape}.")
+    elif not out.flags.c_contiguous:
+        raise ValueError("`out` must be C-contiguous.")
+    flat_points = points.reshape(-1)
+    flat_out = out.reshape(-1)
+    for start in range(0, flat_points.size, chunk_size):
+        stop = start + chunk_size
+        flat_out[start:stop] = compiled(flat_points[start:stop])
+    return out
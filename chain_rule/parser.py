@@ -0,0 +1,215 @@
+#Tokenizer and Pratt parser for the calculator's input grammar, building SymPy
+#trees directly. Nothing is evaluated as Python, unlike sp.sympify.
+#
+#    expr    := numbers, names, function calls, ( ... )
+#               with + - * / and ^ or ** (right-associative, binds tightest)
+#    2x, 3(x+1), (x+1)(x-1), x sin(x)   implicit multiplication
+#
+#Unknown names are symbols (xy is one symbol). A name directly followed by
+#"(" must be a known function, except single letters, which multiply:
+#x(x+1) is x*(x+1).
+
+import re
+
+import sympy as sp
+
+from . import limits
+
+FUNCTIONS = {
+    "sin": sp.sin, "cos": sp.cos, "tan": sp.tan,
+    "cot": sp.cot, "sec": sp.sec, "csc": sp.csc,
+    "asin": sp.asin, "acos": sp.acos, "atan": sp.atan,
+    "sinh": sp.sinh, "cosh": sp.cosh, "tanh": sp.tanh,
+    "exp": sp.exp, "log": sp.log, "ln": sp.log,
+    "sqrt": sp.sqrt, "abs": sp.Abs,
+}
+# Most functions take one argument; these also take a second (log base).
+_MAX_ARGS = {"log": 2}
+
+CONSTANTS = {"pi": sp.pi, "E": sp.E}
+
+
+class ParseError(ValueError):
+    # `position` is a 0-based index into the text.
+    def __init__(self, message, text, position):
+        self.text = text
+        self.position = position
+        super().__init__(f"{message} at position {position + 1}:\n    {text}\n    {' ' * position}^")
+
+    def __reduce__(self):
+        return _rebuild_parse_error, (str(self), self.text, self.position)
+
+    def to_dict(self):
+        return {"position": self.position}
+
+
+def _rebuild_parse_error(message, text, position):
+    error = ParseError.__new__(ParseError)
+    ValueError.__init__(error, message)
+    error.text = text
+    error.position = position
+    return error
+
+
+_TOKEN = re.compile(r"""
+    (?P<space>\s+)
+  | (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+  | (?P<name>[A-Za-z_][A-Za-z0-9_]*)
+  | (?P<op>\*\*|[-+*/^(),])
+""", re.VERBOSE)
+
+
+def tokenize(text):
+    # Yields (kind, value, position); kind is "number", "name", "op" or "end".
+    position = 0
+    while position < len(text):
+        match = _TOKEN.match(text, position)
+        if match is None:
+            raise ParseError(f"Unexpected character {text[position]!r}", text, position)
+        kind = match.lastgroup
+        if kind != "space":
+            value = match.group()
+            yield kind, "^" if value == "**" else value, position
+        position = match.end()
+    yield "end", "", len(text)
+
+
+# A numeric power may build a number as big as a 64-bit base raised to
+# max_exponent, and no bigger.
+_BITS_PER_EXPONENT = 64
+
+# Binding powers. Implicit multiplication binds like * and /, so 2x^2 is
+# 2*(x^2) and 1/2x is (1/2)*x, as in Python. Unary minus sits between * and
+# ^, so -x^2 is -(x^2) and 2^-x works.
+_INFIX = {"+": 10, "-": 10, "*": 20, "/": 20, "^": 40}
+_IMPLICIT = 20
+_PREFIX = 30
+
+
+class _Parser:
+    def __init__(self, text):
+        self.text = text
+        self.tokens = list(tokenize(text))
+        self.index = 0
+
+    @property
+    def token(self):
+        return self.tokens[self.index]
+
+    def advance(self):
+        token = self.tokens[self.index]
+        self.index += 1
+        return token
+
+    def error(self, message, token=None):
+        raise ParseError(message, self.text, (token or self.token)[2])
+
+    def expect(self, value):
+        if self.token[1] != value or self.token[0] == "end":
+            found = "end of input" if self.token[0] == "end" else repr(self.token[1])
+            self.error(f"Expected {value!r} but found {found}")
+        return self.advance()
+
+    def parse(self):
+        if self.token[0] == "end":
+            self.error("Empty input")
+        expr = self.expression(0)
+        if self.token[0] != "end":
+            self.error(f"Unexpected {self.token[1]!r}")
+        return expr
+
+    def expression(self, min_power):
+        left = self.prefix()
+        while True:
+            kind, value, _ = self.token
+            if kind == "op" and value in _INFIX:
+                power = _INFIX[value]
+                if power <= min_power:
+                    return left
+                operator = self.advance()
+                # ^ is right-associative: its right side may hold another ^.
+                right = self.expression(power - 1 if value == "^" else power)
+                left = _binary(operator, left, right)
+            elif kind in ("number", "name") or value == "(":
+                if _IMPLICIT <= min_power:
+                    return left
+                if kind == "number" and self.tokens[self.index - 1][0] == "number":
+                    self.error("Expected an operator between numbers")
+                left = sp.Mul(left, self.expression(_IMPLICIT))
+            else:
+                return left
+
+    def prefix(self):
+        token = self.advance()
+        kind, value, _ = token
+        if kind == "number":
+            if any(c in value for c in ".eE"):
+                return sp.Float(value)
+            return sp.Integer(value)
+        if kind == "name":
+            return self.name(token)
+        if value == "(":
+            inner = self.expression(0)
+            self.expect(")")
+            return inner
+        if value == "-":
+            return sp.Mul(sp.S.NegativeOne, self.expression(_PREFIX))
+        if value == "+":
+            return self.expression(_PREFIX)
+        if kind == "end":
+            self.error("Unexpected end of input", token)
+        self.error(f"Unexpected {value!r}", token)
+
+    def name(self, token):
+        _, value, _ = token
+        if self.token[1] == "(" and self.token[0] == "op":
+            if value in FUNCTIONS:
+                return self.call(token)
+            if len(value) > 1:
+                self.error(f"Unknown function {value!r}", token)
+        if value in FUNCTIONS:
+            self.error(f"Expected '(' after {value!r}")
+        if value in CONSTANTS:
+            return CONSTANTS[value]
+        return sp.Symbol(value)
+
+    def call(self, token):
+        name = token[1]
+        self.expect("(")
+        args = [self.expression(0)]
+        while self.token[1] == "," and self.token[0] == "op":
+            self.advance()
+            args.append(self.expression(0))
+        if len(args) > _MAX_ARGS.get(name, 1):
+            self.error(f"Too many arguments for {name!r}", token)
+        self.expect(")")
+        return FUNCTIONS[name](*args)
+
+
+def _binary(operator, left, right):
+    value = operator[1]
+    if value == "+":
+        return sp.Add(left, right)
+    if value == "-":
+        return sp.Add(left, sp.Mul(sp.S.NegativeOne, right))
+    if value == "*":
+        return sp.Mul(left, right)
+    if value == "/":
+        return sp.Mul(left, sp.Pow(right, sp.S.NegativeOne))
+    # Numeric powers are evaluated as soon as they are built, so 9^9^9 has to
+    # be stopped here rather than after parsing. A small exponent isn't enough:
+    # ((9^1000)^1000)^10 has no big one, so the size of the number it would
+    # build is bounded too, estimated before building it.
+    maximum = limits.active.max_exponent
+    if maximum is not None and left.is_Rational and right.is_Integer and abs(left) not in (0, 1):
+        if abs(right) > maximum:
+            raise limits.ResourceLimitError("max_exponent", int(abs(right)), maximum)
+        size = max(abs(left.p), left.q)
+        if abs(right) * size.bit_length() > maximum * _BITS_PER_EXPONENT:
+            raise limits.ResourceLimitError("max_exponent", None, maximum)
+    return sp.Pow(left, right)
+
+
+def parse(text):
+    # Returns a SymPy expression or raises ParseError (a ValueError).
+    return _Parser(text).parse()
@@ -0,0 +1,126 @@
+#Persistent derivative results, so a restarted worker doesn't pay sp.simplify
+#again for problems it has already solved.
+
+import sqlite3
+import threading
+import time
+
+import sympy as sp
+
+from .cache import LRUCache
+from .steps import Steps
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    mode TEXT NOT NULL,
+    first TEXT NOT NULL,
+    second TEXT NOT NULL,
+    variable TEXT NOT NULL,
+    engine_version TEXT NOT NULL,
+    result TEXT NOT NULL,
+    steps TEXT NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (mode, first, second, variable, engine_version)
+)
+"""
+
+
+class ResultCache:
+    # SQLite-backed store keyed on (mode, first, second, variable,
+    # engine_version), with an in-memory LRU layer in front of it. Rows beyond
+    # `max_entries` are evicted least-recently-used first.
+    def __init__(self, path, max_entries=100_000, memory_entries=1024, preload=0):
+        self.path = path
+        self.max_entries = max_entries
+        self.memory = LRUCache(max_entries=memory_entries)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(_SCHEMA)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)")
+        self._conn.commit()
+        self._rows = self._count()
+        if preload:
+            self.preload(preload)
+
+    def _count(self):
+        return self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def preload(self, limit=None):
+        # Warm the memory layer with the most recently used rows. Returns the
+        # number of rows loaded.
+        limit = min(limit or self.memory.max_entries, self.memory.max_entries)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT mode, first, second, variable, engine_version, result, steps "
+                "FROM results ORDER BY last_used DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        # Oldest first, so the most recent rows end up hottest in the LRU.
+        for *key, result, steps in reversed(rows):
+            self.memory.put(tuple(key), (sp.sympify(result), Steps.loads(steps)))
+        return len(rows)
+
+    def get(self, key):
+        # Returns (result_expr, Steps) or None.
+        hit = self.memory.get(key)
+        if hit is not None:
+            return hit
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result, steps FROM results WHERE mode=? AND first=? AND second=? "
+                "AND variable=? AND engine_version=?",
+                key,
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE results SET last_used=? WHERE mode=? AND first=? AND second=? "
+                "AND variable=? AND engine_version=?",
+                (time.time(), *key),
+            )
+            self._conn.commit()
+        hit = (sp.sympify(row[0]), Steps.loads(row[1]))
+        self.memory.put(key, hit)
+        return hit
+
+    def put(self, key, result, steps):
+        self.memory.put(key, (result, steps))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (*key, sp.srepr(result), steps.dumps(), time.time()),
+            )
+            self._rows += 1
+            if self._rows > self.max_entries:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        # Other processes may share the file, so recount before trimming, and
+        # trim an extra 10% so we don't evict on every insert near the cap.
+        self._rows = self._count()
+        excess = self._rows - int(self.max_entries * 0.9)
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM results WHERE rowid IN "
+                "(SELECT rowid FROM results ORDER BY last_used ASC LIMIT ?)",
+                (excess,),
+            )
+            self._rows -= excess
+
+    def __len__(self):
+        with self._lock:
+            return self._count()
+
+    def clear(self):
+        self.memory.clear()
+        with self._lock:
+            self._conn.execute("DELETE FROM results")
+            self._conn.commit()
+            self._rows = 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
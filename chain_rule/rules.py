@@ -0,0 +1,80 @@
+#Table-driven differentiation. Rules are looked up by the node type of the
+#parsed expression, never by the input text, so "sin( u )", "sin(u)" and a
+#sin nested three levels deep all hit the same rule.
+
+import sympy as sp
+
+# Derivative of f(a) with respect to a, for single-argument functions.
+FUNCTION_RULES = {
+    sp.sin: lambda a: sp.cos(a),
+    sp.cos: lambda a: -sp.sin(a),
+    sp.tan: lambda a: sp.sec(a)**2,
+    sp.cot: lambda a: -sp.csc(a)**2,
+    sp.sec: lambda a: sp.sec(a) * sp.tan(a),
+    sp.csc: lambda a: -sp.csc(a) * sp.cot(a),
+    sp.exp: lambda a: sp.exp(a),
+    sp.log: lambda a: 1 / a,
+    sp.asin: lambda a: 1 / sp.sqrt(1 - a**2),
+    sp.acos: lambda a: -1 / sp.sqrt(1 - a**2),
+    sp.atan: lambda a: 1 / (1 + a**2),
+    sp.sinh: lambda a: sp.cosh(a),
+    sp.cosh: lambda a: sp.sinh(a),
+    sp.tanh: lambda a: 1 - sp.tanh(a)**2,
+    # Undefined at 0, where sign gives 0.
+    sp.Abs: lambda a: sp.sign(a),
+}
+
+
+def register_rule(function, derivative):
+    # `derivative(a)` must return d/da function(a).
+    FUNCTION_RULES[function] = derivative
+
+
+def differentiate(expr, x, memo=None):
+    # d(expr)/dx. `memo` maps (subexpression, variable) to its derivative;
+    # pass the same dict across calls, in the same or different variables, so
+    # a subexpression shared between them (or repeated inside one expression)
+    # is only differentiated once per variable.
+    if memo is None:
+        memo = {}
+    return _differentiate(expr, x, memo)
+
+
+def _differentiate(expr, x, memo):
+    key = (expr, x)
+    cached = memo.get(key)
+    if cached is not None:
+        return cached
+
+    if not expr.has(x):
+        derivative = sp.S.Zero
+    elif expr == x:
+        derivative = sp.S.One
+    elif expr.is_Add:
+        derivative = sp.Add(*(_differentiate(arg, x, memo) for arg in expr.args))
+    elif expr.is_Mul:
+        args = expr.args
+        derivative = sp.Add(*(
+            sp.Mul(*args[:i], _differentiate(arg, x, memo), *args[i + 1:])
+            for i, arg in enumerate(args)
+            if arg.has(x)
+        ))
+    elif expr.is_Pow:
+        base, exponent = expr.args
+        if not exponent.has(x):
+            derivative = exponent * base**(exponent - 1) * _differentiate(base, x, memo)
+        elif not base.has(x):
+            derivative = expr * sp.log(base) * _differentiate(exponent, x, memo)
+        else:
+            derivative = expr * (
+                _differentiate(exponent, x, memo) * sp.log(base)
+                + exponent * _differentiate(base, x, memo) / base
+            )
+    elif expr.func in FUNCTION_RULES and len(expr.args) == 1:
+        arg = expr.args[0]
+        derivative = FUNCTION_RULES[expr.func](arg) * _differentiate(arg, x, memo)
+    else:
+        derivative = sp.diff(expr, x)
+
+    memo[key] = derivative
+    return derivative
@@ -0,0 +1,298 @@
+#Local JSON-over-HTTP service: `python -m chain_rule serve`.
+#
+#    POST /derivative  {"mode": "chain", "inner": "2*x+5", "outer": "u^2",
+#                       "variable": "x", "deadline_ms": 2000}
+#    GET  /health
+#
+#Jobs run on a pool of DerivativeWorker processes. Identical requests that are
+#in flight at the same time share one computation, the number of distinct
+#computations queued or running is capped (503 beyond that), and every request
+#has a deadline (504 when it passes).
+
+import asyncio
+import json
+import os
+import time
+
+from .cli import record_to_job
+from .engine import normalize_input
+from .limits import ResourceLimitError
+from .worker import DerivativeWorker, WorkerOutcome
+
+DEFAULT_DEADLINE = 10.0
+MAX_BODY_BYTES = 64 * 1024
+
+_REASONS = {
+    200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    413: "Payload Too Large", 422: "Unprocessable Entity", 500: "Internal Server Error", 503: "Service Unavailable", 504: "Gateway Timeout",
+}
+
+
+class Overloaded(Exception):
+    pass
+
+
+class AsyncWorkerPool:
+    # Async front for a set of DerivativeWorkers. A worker's pipe is watched
+    # with loop.add_reader, so this needs a selector event loop (the default
+    # on POSIX).
+    def __init__(self, size, max_pending, limits=None, result_cache=None, result_cache_preload=0):
+        self.workers = [
+            DerivativeWorker(limits=limits, result_cache=result_cache, result_cache_preload=result_cache_preload)
+            for _ in range(size)
+        ]
+        self.max_pending = max_pending
+        self.pending = 0
+        self._idle = asyncio.Queue()
+
+    def start(self):
+        for worker in self.workers:
+            worker.start()
+            self._idle.put_nowait(worker)
+
+    def close(self):
+        for worker in self.workers:
+            worker.close()
+
+    async def run(self, job, timeout):
+        if self.pending >= self.max_pending:
+            raise Overloaded()
+        self.pending += 1
+        try:
+            worker = await self._idle.get()
+            try:
+                return await self._run_on(worker, job, timeout)
+            finally:
+                self._idle.put_nowait(worker)
+        finally:
+            self.pending -= 1
+
+    async def _run_on(self, worker, job, timeout):
+        job_id = worker.submit(*job)
+        deadline = time.monotonic() + timeout
+        try:
+            while True:
+                remaining = min(deadline, worker.deadline or deadline) - time.monotonic()
+                if remaining <= 0:
+                    # A job over the workers' wall-time limit is reported by
+                    # poll() as a ResourceLimitError.
+                    for outcome in worker.poll():
+                        if outcome.job_id == job_id:
+                            return outcome
+                    if time.monotonic() < deadline:
+                        continue
+                    worker.cancel()
+                    return WorkerOutcome(job_id, error=TimeoutError(f"Deadline of {timeout:g}s exceeded."))
+                if await _wait_readable(worker.connection, remaining):
+                    for outcome in worker.poll():
+                        if outcome.job_id == job_id:
+                            return outcome
+                    if not worker.busy:
+                        # The worker died and poll() already reported it.
+                        return WorkerOutcome(job_id, error=RuntimeError("Worker process exited unexpectedly."))
+        except asyncio.CancelledError:
+            # Everybody waiting on this job gave up; stop the computation.
+            worker.cancel()
+            raise
+
+
+async def _wait_readable(conn, timeout):
+    loop = asyncio.get_running_loop()
+    ready = loop.create_future()
+    fd = conn.fileno()
+    loop.add_reader(fd, lambda: ready.done() or ready.set_result(None))
+    try:
+        await asyncio.wait_for(ready, timeout)
+        return True
+    except asyncio.TimeoutError:
+        return False
+    finally:
+        loop.remove_reader(fd)
+
+
+class DerivativeService:
+    def __init__(self, workers=None, max_pending=256, max_deadline=DEFAULT_DEADLINE, limits=None,
+                 result_cache=None, result_cache_preload=0):
+        self.pool = AsyncWorkerPool(workers or os.cpu_count() or 1, max_pending, limits, result_cache, result_cache_preload)
+        self.max_deadline = max_deadline
+        # key -> [task, waiter_count]
+        self._in_flight = {}
+        self.coalesced = 0
+        self.computed = 0
+
+    def start(self):
+        self.pool.start()
+
+    def close(self):
+        for task, _ in self._in_flight.values():
+            task.cancel()
+        self.pool.close()
+
+    async def solve(self, record):
+        # Returns (status, body_dict).
+        job = record_to_job(record)
+        mode, first, second, variable = job
+        deadline = self.max_deadline
+        if record.get("deadline_ms") is not None:
+            deadline = min(float(record["deadline_ms"]) / 1000, self.max_deadline)
+        key = (mode, normalize_input(first), normalize_input(second), variable.strip())
+
+        entry = self._in_flight.get(key)
+        coalesced = entry is not None
+        if coalesced:
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(self.pool.run(job, self.max_deadline))
+            entry = self._in_flight[key] = [task, 0]
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None) if self._in_flight.get(key) is entry else None)
+            self.computed += 1
+        entry[1] += 1
+
+        started = time.perf_counter()
+        try:
+            outcome = await asyncio.wait_for(asyncio.shield(entry[0]), deadline)
+        except asyncio.TimeoutError:
+            return 504, {"error": f"Deadline of {deadline:g}s exceeded.", "error_type": "TimeoutError"}
+        except Overloaded:
+            return 503, {"error": "Too many requests in flight; retry later.", "error_type": "Overloaded"}
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0 and not entry[0].done():
+                # Out of _in_flight first: a request arriving before the done
+                # callback runs must start afresh, not join a cancelled task.
+                if self._in_flight.get(key) is entry:
+                    del self._in_flight[key]
+                entry[0].cancel()
+
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 3)
+        if isinstance(outcome.error, ResourceLimitError):
+            return 422, {
+                "error": str(outcome.error), "error_type": "ResourceLimitError",
+                **outcome.error.to_dict(), "coalesced": coalesced,
+            }
+        if outcome.error is not None:
+            status = 400 if isinstance(outcome.error, ValueError) else 504 if isinstance(outcome.error, TimeoutError) else 500
+            details = outcome.error.to_dict() if hasattr(outcome.error, "to_dict") else {}
+            return status, {
+                "error": str(outcome.error), "error_type": type(outcome.error).__name__,
+                **details, "coalesced": coalesced,
+            }
+        result = outcome.result
+        return 200, {
+            "mode": result.mode,
+            "result": str(result.result),
+            "steps": result.steps.text(),
+            "variable": result.variable,
+            "elapsed_ms": elapsed_ms,
+            "coalesced": coalesced,
+        }
+
+    def health(self):
+        return {
+            "status": "ok",
+            "workers": len(self.pool.workers),
+            "pending": self.pool.pending,
+            "in_flight": len(self._in_flight),
+            "computed": self.computed,
+            "coalesced": self.coalesced,
+        }
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                status, payload = await self._route(method, path, body)
+                keep_alive = headers.get("connection", "").lower() != "close"
+                _write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except _BadRequest as e:
+            _write_response(writer, e.status, {"error": str(e)}, keep_alive=False)
+        finally:
+            writer.close()
+
+    async def _route(self, method, path, body):
+        if path == "/health":
+            return 200, self.health()
+        if path != "/derivative":
+            return 404, {"error": f"No such endpoint: {path}"}
+        if method != "POST":
+            return 405, {"error": "Use POST."}
+        try:
+            record = json.loads(body or b"{}")
+        except json.JSONDecodeError as e:
+            return 400, {"error": f"Invalid JSON: {e}", "error_type": "ValueError"}
+        if not isinstance(record, dict):
+            return 400, {"error": "Expected a JSON object.", "error_type": "ValueError"}
+        try:
+            return await self.solve(record)
+        except (TypeError, ValueError) as e:
+            return 400, {"error": str(e), "error_type": "ValueError"}
+
+
+class _BadRequest(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+async def _read_request(reader):
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, path, _ = line.decode("latin-1").split(" ", 2)
+    except ValueError:
+        raise _BadRequest("Malformed request line.")
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get("content-length") or 0)
+    except ValueError:
+        raise _BadRequest("Invalid Content-Length.")
+    if length < 0:
+        raise _BadRequest("Invalid Content-Length.")
+    if length > MAX_BODY_BYTES:
+        raise _BadRequest("Request body too large.", 413)
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), path.split("?", 1)[0], headers, body
+
+
+def _write_response(writer, status, payload, keep_alive):
+    body = json.dumps(payload).encode("utf-8")
+    head = (
+        f"HTTP/1.1 {status} {_REASONS.get(status, 'Error')}\r\n"
+        f"Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+    )
+    if status == 503:
+        head += "Retry-After: 1\r\n"
+    writer.write(head.encode("latin-1") + b"\r\n" + body)
+
+
+async def serve(host="127.0.0.1", port=8765, unix_path=None, **options):
+    service = DerivativeService(**options)
+    service.start()
+    if unix_path:
+        server = await asyncio.start_unix_server(service.handle_connection, path=unix_path)
+    else:
+        server = await asyncio.start_server(service.handle_connection, host, port)
+    try:
+        async with server:
+            for sock in server.sockets:
+                print(f"Serving on {sock.getsockname()}", flush=True)
+            await server.serve_forever()
+    finally:
+        service.close()
@@ -0,0 +1,233 @@
+#Tiered simplification. Cheap rewrites run first; the full sp.simplify only
+#runs when they leave a large expression and the budget allows it.
+
+import signal
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+
+import sympy as sp
+from sympy.functions.elementary.trigonometric import TrigonometricFunction
+
+from .cache import LRUCache
+
+
+@dataclass(frozen=True)
+class SimplifyBudget:
+    # Wall-clock limit for the whole call. A tier still running when it
+    # expires is interrupted, but only on the main thread of a POSIX process;
+    # elsewhere the limit just stops escalation to the full simplify.
+    max_seconds: float | None = 2.0
+    # Skip the full simplify for expressions bigger than this (count_ops).
+    max_ops: int | None = 400
+    # A cheap-tier result this small is kept as is.
+    good_enough_ops: int = 4
+
+
+default_budget = SimplifyBudget()
+
+simplify_cache = LRUCache(max_entries=2048)
+
+# Counts simplifications the time limit cut short. What they return depends on
+# how busy the machine was, so they aren't cached here, and callers that keep
+# results (engine._cached) compare timeout_count() before and after to skip
+# theirs too.
+_timeouts = 0
+
+
+def timeout_count():
+    return _timeouts
+
+
+def _timed_out():
+    global _timeouts
+    _timeouts += 1
+
+
+class _SimplifyTimeout(Exception):
+    pass
+
+
+@contextmanager
+def _time_limit(seconds):
+    if (
+        seconds is None
+        or not hasattr(signal, "setitimer")
+        or threading.current_thread() is not threading.main_thread()
+    ):
+        yield
+        return
+
+    def _expire(signum, frame):
+        raise _SimplifyTimeout()
+
+    # A timer the caller armed is put back afterwards with whatever time it
+    # had left; if that ran out meanwhile it fires as soon as it's restored.
+    previous = signal.signal(signal.SIGALRM, _expire)
+    started = time.monotonic()
+    previous_delay, previous_interval = signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+        if previous_delay:
+            remaining = previous_delay - (time.monotonic() - started)
+            signal.setitimer(signal.ITIMER_REAL, max(remaining, 1e-6), previous_interval)
+
+
+def _cheap_candidates(expr):
+    yield sp.cancel(expr)
+    yield sp.together(expr)
+    if expr.has(TrigonometricFunction):
+        yield sp.trigsimp(expr)
+
+
+def simplify_expression(expr, budget=None):
+    budget = budget or default_budget
+    key = (expr, budget)
+    cached = simplify_cache.get(key)
+    if cached is not None:
+        return cached
+
+    best, best_ops = expr, sp.count_ops(expr)
+    timed_out = False
+    try:
+        with _time_limit(budget.max_seconds):
+            deadline = None if budget.max_seconds is None else time.perf_counter() + budget.max_seconds
+            for candidate in _cheap_candidates(expr):
+                ops = sp.count_ops(candidate)
+                if ops < best_ops:
+                    best, best_ops = candidate, ops
+            if best_ops > budget.good_enough_ops and (budget.max_ops is None or best_ops <= budget.max_ops):
+                if deadline is not None and time.perf_counter() >= deadline:
+                    timed_out = True
+                else:
+                    candidate = sp.simplify(best)
+                    if sp.count_ops(candidate) <= best_ops:
+                        best = candidate
+    except _SimplifyTimeout:
+        # Keep whatever the finished tiers produced.
+        timed_out = True
+
+    if timed_out:
+        _timed_out()
+    else:
+        simplify_cache.put(key, best)
+    return best
+
+
+#Result forms. A quotient-rule derivative can be written several ways, and
+#the one sp.simplify lands on is often neither the smallest nor the cheapest to
+#evaluate; expanding a long rational one can take longer than the rest of the
+#problem. quotient_forms builds a few candidates under the budget and ranks
+#them with a simple evaluation-cost model.
+
+@dataclass(frozen=True)
+class Form:
+    name: str
+    expr: sp.Expr
+    ops: int
+    # Estimated cost of evaluating `expr` once; see evaluation_cost.
+    cost: int
+
+
+# Relative costs of floating-point operations, in additions.
+_OPERATION_COSTS = {"add": 1, "mul": 1, "div": 4, "sqrt": 6, "pow": 20, "function": 20}
+
+# (raw derivative, variable, budget) -> tuple of Forms, cheapest first
+forms_cache = LRUCache(max_entries=1024)
+
+
+def evaluation_cost(expr):
+    # A repeated subexpression is only counted once, as it would be after
+    # common-subexpression elimination, and integer powers cost the
+    # multiplications of square-and-multiply. So a denominator kept as a
+    # power is cheaper than the same polynomial expanded.
+    costs = _OPERATION_COSTS
+    seen = set()
+    total = 0
+    stack = [expr]
+    while stack:
+        node = stack.pop()
+        if not node.args or node in seen:
+            continue
+        seen.add(node)
+        stack.extend(node.args)
+        if node.is_Add:
+            total += costs["add"] * (len(node.args) - 1)
+        elif node.is_Mul:
+            total += costs["mul"] * (len(node.args) - 1)
+        elif node.is_Pow:
+            exponent = node.exp
+            if exponent.is_Integer:
+                n = abs(int(exponent))
+                total += costs["mul"] * (n.bit_length() + bin(n).count("1") - 2)
+            elif exponent.is_Rational and exponent.q == 2:
+                total += costs["sqrt"]
+            else:
+                total += costs["pow"]
+            if exponent.is_negative:
+                total += costs["div"]
+        else:
+            total += costs["function"]
+    return total
+
+
+def _form(name, expr):
+    return Form(name, expr, int(sp.count_ops(expr)), evaluation_cost(expr))
+
+
+def quotient_forms(raw, x, budget=None):
+    # `raw` is (u'v - uv')/v^2 as the rule builds it, which is the first
+    # candidate ("unexpanded"). Returns every form that finished within the
+    # budget, cheapest first; ties keep the order they were built in.
+    budget = budget or default_budget
+    key = (raw, x, budget)
+    cached = forms_cache.get(key)
+    if cached is not None:
+        return cached
+
+    deadline = None if budget.max_seconds is None else time.perf_counter() + budget.max_seconds
+    forms = [_form("unexpanded", raw)]
+    timeouts = _timeouts
+
+    def attempt(name, build):
+        remaining = None if deadline is None else deadline - time.perf_counter()
+        if remaining is not None and remaining <= 0:
+            _timed_out()
+            return None
+        try:
+            with _time_limit(remaining):
+                expr = build()
+        except _SimplifyTimeout:
+            _timed_out()
+            return None
+        except (sp.PolynomialError, NotImplementedError):
+            return None
+        if all(expr != form.expr for form in forms):
+            forms.append(_form(name, expr))
+        return expr
+
+    cancelled = attempt("cancelled", lambda: sp.cancel(raw))
+    if cancelled is not None:
+        attempt("factored", lambda: sp.factor(cancelled))
+    small = budget.max_ops is None or min(form.ops for form in forms) <= budget.max_ops
+    if cancelled is not None and small and cancelled.is_rational_function(x):
+        attempt("partial fractions", lambda: sp.apart(cancelled, x))
+    elif small:
+        # Not rational in x (trig, exp, ...): the tiered simplify has rewrites
+        # the polynomial forms don't. It enforces its own time limit.
+        remaining = None if deadline is None else deadline - time.perf_counter()
+        if remaining is not None and remaining <= 0:
+            _timed_out()
+        else:
+            simplified = simplify_expression(raw, replace(budget, max_seconds=remaining))
+            if all(simplified != form.expr for form in forms):
+                forms.append(_form("simplified", simplified))
+
+    ranked = tuple(sorted(forms, key=lambda form: (form.cost, form.ops)))
+    if _timeouts == timeouts:
+        forms_cache.put(key, ranked)
+    return ranked
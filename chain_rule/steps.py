@@ -0,0 +1,123 @@
+#Step-by-step solutions as data. Steps keeps each line as text plus references
+#to the expressions involved, and nothing is converted to a string until the
+#steps are shown or exported, so a huge intermediate result costs nothing
+#unless someone looks at it. When shown, expressions over a size limit can be
+#elided and expanded later; exports (text, JSON, LaTeX) work from the stored
+#expressions without redoing any calculus.
+
+import json
+import re
+from dataclasses import dataclass
+
+import sympy as sp
+
+# Expressions with more nodes than this are elided when steps are shown with
+# the default limit.
+ELIDE_NODES = 2000
+
+_LATEX_SPECIAL = re.compile(r"[\\{}$&#^_%~]")
+_LATEX_ESCAPES = {
+    "\\": r"\textbackslash{}", "^": r"\textasciicircum{}", "~": r"\textasciitilde{}",
+}
+
+
+@dataclass(frozen=True)
+class Steps:
+    # One tuple of parts per line; a part is a str or a SymPy expression.
+    lines: tuple
+
+    @classmethod
+    def of(cls, *lines):
+        # Each line is a str or a sequence of parts.
+        return cls(tuple((line,) if isinstance(line, str) else tuple(line) for line in lines))
+
+    def __add__(self, other):
+        return Steps(self.lines + other.lines)
+
+    def __str__(self):
+        return self.text()
+
+    def map(self, expr_function, text_function=None):
+        # A copy with every expression (and optionally every text part)
+        # passed through the given function.
+        return Steps(tuple(
+            tuple(
+                (text_function(part) if text_function else part) if isinstance(part, str) else expr_function(part)
+                for part in line
+            )
+            for line in self.lines
+        ))
+
+    def expressions(self):
+        return [part for line in self.lines for part in line if not isinstance(part, str)]
+
+    def render(self, max_nodes=None):
+        # Yields (text, elided) pieces that join up to the plain-text steps.
+        # `elided` is the expression when it had more than max_nodes nodes and
+        # `text` is a short stand-in for it; otherwise it is None.
+        for number, line in enumerate(self.lines):
+            if number:
+                yield "\n", None
+            for part in line:
+                if isinstance(part, str):
+                    yield part, None
+                elif max_nodes is not None and _larger_than(part, max_nodes):
+                    yield f"[expression with over {max_nodes} nodes, elided]", part
+                else:
+                    yield str(part), None
+
+    def text(self, max_nodes=None):
+        return "".join(text for text, _ in self.render(max_nodes))
+
+    def latex(self):
+        # Text in the running paragraph, expressions as inline math; blank
+        # lines become paragraph breaks and leading spaces an indent.
+        paragraphs = [[]]
+        for line in self.lines:
+            if all(isinstance(part, str) and not part for part in line):
+                paragraphs.append([])
+                continue
+            pieces = []
+            for part in line:
+                if isinstance(part, str):
+                    if not pieces and part.startswith(" "):
+                        pieces.append(r"\quad ")
+                        part = part.lstrip(" ")
+                    pieces.append(_escape_latex(part))
+                else:
+                    pieces.append(f"${sp.latex(part)}$")
+            paragraphs[-1].append("".join(pieces))
+        return "\n\n".join(" \\\\\n".join(lines) for lines in paragraphs if lines)
+
+    def to_dict(self):
+        # For JSON export: each expression as its text and its LaTeX.
+        return {"lines": [
+            [part if isinstance(part, str) else {"expr": str(part), "latex": sp.latex(part)} for part in line]
+            for line in self.lines
+        ]}
+
+    def to_json(self, **options):
+        return json.dumps(self.to_dict(), **options)
+
+    def dumps(self):
+        # Lossless form for storage (see loads); expressions as srepr.
+        return json.dumps([[part if isinstance(part, str) else {"srepr": sp.srepr(part)} for part in line] for line in self.lines])
+
+    @classmethod
+    def loads(cls, data):
+        return cls(tuple(
+            tuple(part if isinstance(part, str) else sp.sympify(part["srepr"]) for part in line)
+            for line in json.loads(data)
+        ))
+
+
+def _larger_than(expr, limit):
+    # Stops counting at the limit, so a huge expression isn't walked in full.
+    for count, _ in enumerate(sp.preorder_traversal(expr), 1):
+        if count > limit:
+            return True
+    return False
+
+
+def _escape_latex(text):
+    return _LATEX_SPECIAL.sub(lambda m: _LATEX_ESCAPES.get(m.group(), "\\" + m.group()), text)
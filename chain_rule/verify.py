@@ -0,0 +1,84 @@
+#Numeric spot check of a symbolic derivative. Much cheaper than proving
+#sp.simplify(a - b) == 0: compare the derivative with a central finite
+#difference of the original function at a batch of random points. Needs NumPy.
+
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+from .numeric import compile_expression
+
+# Points where the two finite-difference step sizes disagree by more than this
+# (relative) are too close to a pole (tan, 1/x, ...) or oscillate too fast to
+# say anything, and are skipped rather than compared.
+ILL_CONDITIONED = 1e-3
+
+
+@dataclass(frozen=True)
+class VerificationResult:
+    # True / False, or None when too few points were usable to decide.
+    passed: bool | None
+    checked: int
+    skipped: int
+    max_error: float
+    # A sample point where the check failed, if any.
+    counterexample: float | None
+    elapsed_ms: float
+
+
+def verify_result(result, samples=64, low=-5.0, high=5.0, rtol=1e-5, atol=1e-7, min_points=8, seed=0):
+    # `result` is a DerivativeResult. Points where the function or derivative
+    # is undefined (log/sqrt of negatives, poles of tan, ...) are skipped.
+    if result.function is None:
+        raise ValueError("This result doesn't carry its original function, so it can't be verified.")
+    return verify_derivative(
+        result.function, result.result, result.variable,
+        samples=samples, low=low, high=high, rtol=rtol, atol=atol, min_points=min_points, seed=seed,
+    )
+
+
+def verify_derivative(function, derivative, variable="x", samples=64, low=-5.0, high=5.0,
+                      rtol=1e-5, atol=1e-7, min_points=8, seed=0):
+    started = time.perf_counter()
+    f = compile_expression(function, variable)
+    df = compile_expression(derivative, variable)
+
+    points = np.random.default_rng(seed).uniform(low, high, samples)
+    # Step size balancing truncation (h^2) against rounding (eps / h) error.
+    eps = np.finfo(float).eps
+    h = np.cbrt(eps) * np.maximum(1.0, np.abs(points))
+    with np.errstate(all="ignore"):
+        expected = df(points)
+        center = f(points)
+        coarse = (f(points + h) - f(points - h)) / (2 * h)
+        fine = (f(points + h / 2) - f(points - h / 2)) / h
+        # Richardson extrapolation cancels the h^2 term; the gap between the
+        # two step sizes is a (pessimistic) bound on what is left.
+        estimate = (4 * fine - coarse) / 3
+        # Rounding in x alone perturbs f by about eps*|x*f'|, which the
+        # difference quotient blows up by 1/h; steep functions need the slack.
+        rounding = eps * (np.abs(center) + np.abs(points * expected)) / h
+        uncertainty = np.abs(fine - coarse) + rounding
+        scale = np.maximum(np.abs(expected), np.abs(center))
+        usable = (
+            np.isfinite(expected) & np.isfinite(estimate) & np.isfinite(center)
+            # Judged against the estimate, not the claimed derivative, so a
+            # wrong answer can't make a point look well-behaved.
+            & (uncertainty <= ILL_CONDITIONED * np.maximum(np.maximum(np.abs(estimate), np.abs(center)), 1.0))
+        )
+        error = np.abs(estimate - expected)
+        tolerance = atol + rtol * scale + uncertainty
+
+    checked = int(usable.sum())
+    failing = usable & (error > tolerance)
+    max_error = float(error[usable].max()) if checked else 0.0
+    if checked < min_points:
+        passed = None
+    else:
+        passed = not failing.any()
+    counterexample = float(points[failing][0]) if failing.any() else None
+    return VerificationResult(
+        passed, checked, samples - checked, max_error, counterexample,
+        round((time.perf_counter() - started) * 1000, 3),
+    )
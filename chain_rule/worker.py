@@ -0,0 +1,341 @@
+#Runs calculator jobs in a separate process so the caller's thread never
+#blocks on sympy, and so a runaway simplify can be killed outright. Each
+#process works under chain_rule.limits: CPU time and memory are capped inside
+#it, wall time by the DerivativeWorker that owns it.
+
+from __future__ import annotations
+
+import itertools
+import multiprocessing
+import os
+import time
+from dataclasses import dataclass
+from multiprocessing.connection import wait
+from typing import Any
+
+from . import instrument, limits
+from .instrument import Trace
+from .limits import ResourceLimitError, current_limits
+
+
+_READY = "ready"
+# Job mode for submit_simplify.
+_SIMPLIFY = "simplify"
+
+
+@dataclass(frozen=True)
+class WorkerOutcome:
+    job_id: int
+    # A DerivativeResult, or the simplified expression for submit_simplify.
+    result: Any = None
+    error: Exception | None = None
+    # Per-phase timings, when instrumentation is on in the submitting process.
+    trace: Trace | None = None
+    # An unsimplified early result; the final outcome for the job follows.
+    preview: bool = False
+    # The numeric spot check, when the job asked for one: passed / checked /
+    # skipped / max_error, or passed=None and the error if it couldn't run.
+    verified: dict | None = None
+
+
+def _warm_up():
+    # Parse and differentiate something small so the first real job doesn't
+    # pay for sympy's lazy initialisation.
+    import sympy as sp
+
+    from .parser import parse
+
+    x = sp.Symbol("x")
+    sp.diff(parse("sin(x)^2 + exp(x)/x"), x)
+
+
+def _serve(conn, job_limits, result_cache=None, result_cache_preload=0):
+    from .engine import compute_derivative, enable_result_cache, preview_derivative
+    from .parser import ParseError
+    from .simplify import simplify_expression
+
+    limits.configure(job_limits)
+    _warm_up()
+    if result_cache:
+        # Shared by every worker using the same path, so a restarted worker
+        # picks up what the others (and its predecessor) already solved.
+        enable_result_cache(result_cache, preload=result_cache_preload)
+    # After the warm-up, so importing sympy isn't what trips the cap.
+    limits.apply_process_limits(job_limits)
+    # Tell the parent the imports are done, so start-up time isn't charged to
+    # the first job.
+    conn.send(_READY)
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            return
+        if message is None:
+            return
+        job_id, mode, first, second, variable, settings, preview, verify = message
+        instrument.configure(settings.enabled, settings.profile, settings.memory)
+        result = error = verified = None
+        with instrument.trace("worker_job", mode=mode) as trace:
+            try:
+                with limits.cpu_limit(job_limits.cpu_seconds):
+                    if mode == _SIMPLIFY:
+                        # `first` is the expression, `second` the budget.
+                        result = simplify_expression(first, second)
+                    else:
+                        if preview:
+                            _send_preview(conn, job_id, preview_derivative, mode, first, second, variable)
+                        result = compute_derivative(mode, first, second, variable)
+                        if verify:
+                            verified = _verify(result)
+            except (ResourceLimitError, ParseError) as le:
+                error = le
+            except MemoryError:
+                error = ResourceLimitError("memory_mb", None, job_limits.memory_mb)
+            except RecursionError:
+                error = ResourceLimitError("max_depth", None, job_limits.max_depth)
+            except ValueError as ve:
+                error = ValueError(str(ve))
+            except Exception as e:
+                # Arbitrary sympy exceptions don't always pickle; keep the message.
+                error = RuntimeError(str(e))
+        conn.send(WorkerOutcome(job_id, result, error, trace, verified=verified))
+
+
+def _verify(result):
+    # Here rather than in the parent, so a batch's checks run across the pool.
+    try:
+        check = result.verify()
+    except Exception as e:
+        # Symbols other than the variable, functions NumPy can't evaluate, ...
+        return {"passed": None, "error": str(e)}
+    return {"passed": check.passed, "checked": check.checked, "skipped": check.skipped, "max_error": check.max_error}
+
+
+def _send_preview(conn, job_id, preview_derivative, mode, first, second, variable):
+    try:
+        conn.send(WorkerOutcome(job_id, preview_derivative(mode, first, second, variable), preview=True))
+    except ResourceLimitError:
+        raise
+    except Exception:
+        # The full computation reports the same error properly.
+        pass
+
+
+class DerivativeWorker:
+    # One long-lived child process that handles jobs in order. submit() and
+    # poll() never block, which makes this safe to drive from a Tk `after`
+    # loop. cancel() kills the child, dropping whatever it was running, and
+    # starts a fresh one; so does poll() when a job outlives the wall-time
+    # limit, reporting a ResourceLimitError for it.
+    def __init__(self, context=None, limits=None, result_cache=None, result_cache_preload=0):
+        # `result_cache` is a ResultCache path for the child to use, and
+        # `result_cache_preload` how many of its rows to load up front.
+        # spawn rather than fork: forking a process that already runs a Tk
+        # event loop is not safe on every platform.
+        self._context = context or multiprocessing.get_context("spawn")
+        self._process = None
+        self._conn = None
+        self._ids = itertools.count(1)
+        self.limits = limits or current_limits()
+        self.result_cache = result_cache
+        self.result_cache_preload = result_cache_preload
+        self.pending = set()
+        self._submitted = {}
+        self.ready = False
+
+    def start(self):
+        if self._process is not None and self._process.is_alive():
+            return
+        self.ready = False
+        parent, child = self._context.Pipe()
+        self._process = self._context.Process(
+            target=_serve,
+            args=(child, self.limits, self.result_cache, self.result_cache_preload),
+            daemon=True,
+        )
+        self._process.start()
+        child.close()
+        self._conn = parent
+
+    @property
+    def connection(self):
+        return self._conn
+
+    @property
+    def busy(self):
+        return bool(self.pending)
+
+    def submit(self, mode, first, second, variable, preview=False, verify=False):
+        # With preview=True an unsimplified outcome (preview=True) arrives
+        # before the final one. With verify=True the final outcome carries a
+        # numeric spot check of the result (needs NumPy in the worker).
+        self.start()
+        job_id = next(self._ids)
+        # The instrumentation settings travel with each job, so toggling them
+        # in this process takes effect in the child straight away.
+        self._conn.send((job_id, mode, first, second, variable, instrument.settings, preview, verify))
+        self.pending.add(job_id)
+        self._submitted[job_id] = time.monotonic()
+        return job_id
+
+    def submit_simplify(self, expr, budget=None):
+        # simplify_expression(expr, budget) as a job; the outcome's result is
+        # the simplified expression.
+        return self.submit(_SIMPLIFY, expr, budget, None)
+
+    @property
+    def deadline(self):
+        # time.monotonic() by which the oldest pending job must finish, or
+        # None. Jobs run one at a time, so each one's clock starts when it
+        # was submitted or when the job before it finished, whichever is
+        # later, and never before the process has finished starting up.
+        if not self.pending or not self.ready or self.limits.wall_seconds is None:
+            return None
+        return min(self._submitted[job_id] for job_id in self.pending) + self.limits.wall_seconds
+
+    def poll(self):
+        outcomes = []
+        try:
+            while self._conn is not None and self._conn.poll():
+                outcome = self._conn.recv()
+                if outcome == _READY:
+                    self.ready = True
+                    self._restart_clocks()
+                    continue
+                if not outcome.preview:
+                    self.pending.discard(outcome.job_id)
+                    self._submitted.pop(outcome.job_id, None)
+                    # The next job starts now.
+                    self._restart_clocks()
+                outcomes.append(outcome)
+        except (EOFError, OSError):
+            # The child died under us (killed, out of memory, ...).
+            for job_id in sorted(self.pending):
+                outcomes.append(WorkerOutcome(job_id, error=RuntimeError("Worker process exited unexpectedly.")))
+            self.pending.clear()
+            self._submitted.clear()
+            self._discard_process()
+        deadline = self.deadline
+        if deadline is not None and time.monotonic() >= deadline:
+            for job_id in sorted(self.pending):
+                outcomes.append(WorkerOutcome(
+                    job_id, error=ResourceLimitError("wall_seconds", None, self.limits.wall_seconds),
+                ))
+            self.cancel()
+        return outcomes
+
+    def _restart_clocks(self):
+        now = time.monotonic()
+        for job_id in self.pending:
+            self._submitted[job_id] = max(self._submitted[job_id], now)
+
+    def cancel(self):
+        if not self.pending:
+            return
+        self.pending.clear()
+        self._submitted.clear()
+        self._discard_process()
+        self.start()
+
+    def _discard_process(self):
+        if self._process is not None:
+            self._process.kill()
+            self._process.join()
+        if self._conn is not None:
+            self._conn.close()
+        self._process = None
+        self._conn = None
+
+    def close(self):
+        if self._conn is not None and self._process.is_alive():
+            try:
+                self._conn.send(None)
+            except OSError:
+                pass
+            self._process.join(timeout=1)
+        self._discard_process()
+        self.pending.clear()
+        self._submitted.clear()
+
+
+class WorkerPool:
+    # A fixed set of DerivativeWorkers, one job each at a time. Because every
+    # job has a process to itself, a job that overruns its timeout can be
+    # killed without touching the others.
+    def __init__(self, size=None, context=None, limits=None, result_cache=None, result_cache_preload=0):
+        self.size = size or os.cpu_count() or 1
+        self.workers = [
+            DerivativeWorker(context, limits, result_cache, result_cache_preload) for _ in range(self.size)
+        ]
+
+    def start(self):
+        for worker in self.workers:
+            worker.start()
+
+    def close(self):
+        for worker in self.workers:
+            worker.close()
+
+    def imap(self, jobs, timeout=None, ordered=True, max_ahead=None, verify=False):
+        # Yields (index, WorkerOutcome, elapsed_seconds) for each
+        # (mode, first, second, variable) job, spot-checked if `verify`. `jobs` is consumed lazily; in
+        # ordered mode at most `max_ahead` jobs past the oldest unfinished one
+        # are in flight or buffered, which bounds memory on huge inputs.
+        max_ahead = max_ahead or self.size * 4
+        jobs = iter(jobs)
+        idle = list(self.workers)
+        running = {}
+        finished = {}
+        pulled = 0
+        next_index = 0
+        exhausted = False
+
+        while True:
+            while not exhausted and (not ordered or pulled - next_index < max_ahead):
+                worker = next((worker for worker in idle if worker.ready), None)
+                if worker is None:
+                    break
+                try:
+                    job = next(jobs)
+                except StopIteration:
+                    exhausted = True
+                    break
+                idle.remove(worker)
+                running[worker] = (pulled, worker.submit(*job, verify=verify), time.monotonic())
+                pulled += 1
+            if not running and exhausted:
+                break
+
+            wake = [worker.deadline for worker in running if worker.deadline is not None]
+            if timeout is not None and running:
+                wake.append(min(started for _, _, started in running.values()) + timeout)
+            wait_for = max(0, min(wake) - time.monotonic()) if wake else None
+            warming = [worker for worker in idle if not worker.ready]
+            for worker in warming:
+                worker.start()
+            wait([worker.connection for worker in [*running, *warming]], timeout=wait_for)
+            for worker in warming:
+                worker.poll()
+
+            now = time.monotonic()
+            for worker, (index, job_id, started) in list(running.items()):
+                outcomes = worker.poll()
+                if outcomes:
+                    outcome = outcomes[-1]
+                elif timeout is not None and now - started >= timeout:
+                    worker.cancel()
+                    outcome = WorkerOutcome(job_id, error=TimeoutError(f"Timed out after {timeout:g}s."))
+                else:
+                    continue
+                del running[worker]
+                idle.append(worker)
+                finished[index] = (index, outcome, now - started)
+
+            if ordered:
+                while next_index in finished:
+                    yield finished.pop(next_index)
+                    next_index += 1
+            else:
+                for index in list(finished):
+                    yield finished.pop(index)
+                next_index = pulled
@@ -0,0 +1,2 @@
+#Marks the repository root for pytest, so the tests import chain_rule from the
+#checkout with a plain `pytest` as well as with `python -m pytest`.
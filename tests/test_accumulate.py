@@ -0,0 +1,65 @@
+import sympy as sp
+
+from chain_rule.accumulate import RunningSum
+
+x = sp.Symbol("x")
+
+
+def test_like_terms_merge():
+    total = RunningSum()
+    total.add(2 * x * sp.cos(x**2))
+    total.add(3 * x * sp.cos(x**2) + sp.exp(x))
+    total.add(sp.exp(x))
+    assert len(total) == 2
+    assert total.expression() == 5 * x * sp.cos(x**2) + 2 * sp.exp(x)
+
+
+def test_cancels_to_zero():
+    total = RunningSum()
+    total.add(sp.sin(x) + x**2)
+    total.add(-sp.sin(x))
+    assert len(total) == 1
+    total.add(-x**2)
+    assert len(total) == 0
+    assert total.expression() == 0
+
+
+def test_over_limit():
+    total = RunningSum(max_terms=3)
+    total.add(x + x**2 + x**3)
+    assert not total.over_limit
+    total.add(x**4)
+    assert total.over_limit
+
+
+def test_simplified_is_cached_until_the_next_add():
+    total = RunningSum()
+    total.add(sp.sin(x)**2)
+    assert total.simplified(compute=False) is None
+    total.add(sp.cos(x)**2)
+    assert total.simplified() == 1
+    assert total.simplified(compute=False) == 1
+    total.add(x)
+    assert total.simplified(compute=False) is None
+
+
+def test_set_simplified_only_for_the_current_total():
+    total = RunningSum()
+    total.add(sp.sin(x)**2 + sp.cos(x)**2)
+    taken = total.expression()
+    total.set_simplified(taken, sp.Integer(1))
+    assert total.simplified(compute=False) == 1
+    # Worked out for a total that has since changed: ignored.
+    total.add(x)
+    total.set_simplified(taken, sp.Integer(1))
+    assert total.simplified(compute=False) is None
+
+
+def test_clear():
+    total = RunningSum()
+    total.add(x)
+    total.simplified()
+    total.clear()
+    assert len(total) == 0
+    assert total.expression() == 0
+    assert total.simplified(compute=False) is None
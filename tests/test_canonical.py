@@ -0,0 +1,56 @@
+import pytest
+import sympy as sp
+
+from chain_rule import canonical
+from chain_rule.engine import chain_rule_calculator, quotient_rule_calculator
+from chain_rule.parser import parse
+
+x, t = sp.symbols("x t")
+
+
+def test_same_problem_in_another_variable_shares_a_digest():
+    in_x, digest_x = canonical.canonicalize(parse("x^2+1"), x)
+    in_t, digest_t = canonical.canonicalize(parse("1+t^2"), t)
+    assert digest_x == digest_t
+    # Interned: one shared object.
+    assert in_x is in_t
+    assert in_x == canonical.PLACEHOLDER**2 + 1
+
+
+def test_different_problems_differ():
+    _, first = canonical.canonicalize(parse("x^2+1"), x)
+    _, second = canonical.canonicalize(parse("x^2+2"), x)
+    # t is the variable here, so x is just another symbol.
+    _, third = canonical.canonicalize(parse("x^2+1"), t)
+    assert len({first, second, third}) == 3
+
+
+def test_restore():
+    renamed, _ = canonical.canonicalize(parse("sin(t) + y*t"), t)
+    assert t not in renamed.free_symbols
+    assert canonical.restore(renamed, t) == parse("sin(t) + y*t")
+    assert canonical.restore_text(f"d/d{canonical.PLACEHOLDER_NAME} of {renamed}", t) == "d/dt of t*y + sin(t)"
+
+
+def test_placeholder_is_reserved():
+    with pytest.raises(ValueError, match="reserved"):
+        canonical.canonicalize(canonical.PLACEHOLDER + x, x)
+
+
+def test_results_and_steps_come_back_in_the_callers_variable():
+    in_x = chain_rule_calculator("x^2+1", "sin(u)", "x")
+    in_t = chain_rule_calculator("1+t^2", "sin(u)", "t")
+    assert in_t.variable == "t"
+    assert in_t.result == 2 * t * sp.cos(t**2 + 1)
+    assert in_t.result == in_x.result.subs(x, t)
+    text = in_t.steps.text()
+    assert canonical.PLACEHOLDER_NAME not in text
+    assert "g(t) = t**2 + 1" in text
+    assert all(canonical.PLACEHOLDER not in expr.free_symbols for expr in in_t.steps.expressions())
+    assert in_t.function == sp.sin(t**2 + 1)
+
+
+def test_quotient_results_come_back_in_the_callers_variable():
+    result = quotient_rule_calculator("sin(t)", "t", "t")
+    assert sp.simplify(result.result - sp.diff(sp.sin(t) / t, t)) == 0
+    assert canonical.PLACEHOLDER_NAME not in result.steps.text()
@@ -0,0 +1,58 @@
+import io
+import json
+
+import pytest
+
+from chain_rule.cli import _read_records, main, record_to_job
+
+MIXED_CSV = (
+    "id,mode,inner,outer,numerator,denominator,variable\n"
+    "a,chain,x^2+1,sin(u),,,\n"
+    "b,quotient,,,x,x+1,\n"
+    "c,,2t,u^3,,,t\n"
+)
+
+
+@pytest.mark.parametrize("record, job", [
+    ({"inner": "x^2", "outer": "sin(u)"}, ("Chain Rule", "x^2", "sin(u)", "x")),
+    ({"mode": "quotient", "numerator": "x", "denominator": "x+1"}, ("Quotient Rule", "x", "x+1", "x")),
+    ({"mode": "Quotient Rule", "inner": "x", "outer": "x+1", "variable": "t"}, ("Quotient Rule", "x", "x+1", "t")),
+    ({"mode": "chain", "numerator": "x^2", "denominator": "u^2"}, ("Chain Rule", "x^2", "u^2", "x")),
+    ({"mode": "chain_rule", "inner": 2, "outer": "u"}, ("Chain Rule", "2", "u", "x")),
+    ({}, ("Chain Rule", "", "", "x")),
+    ({"_error": "Invalid JSON"}, ("invalid", "", "", "")),
+])
+def test_record_to_job(record, job):
+    assert record_to_job(record) == job
+
+
+def test_jsonl_records():
+    stream = io.StringIO('{"inner": "x^2", "outer": "u^2"}\n\n{not json}\n{"mode": "quotient"}\n')
+    records = list(_read_records(stream, "jsonl"))
+    assert len(records) == 3
+    assert records[0] == {"inner": "x^2", "outer": "u^2"}
+    assert records[1]["_error"].startswith("Invalid JSON")
+    assert record_to_job(records[2]) == ("Quotient Rule", "", "", "x")
+
+
+def test_csv_with_both_pairs_of_columns():
+    # Every row has all four columns; the pair the mode doesn't use is empty.
+    jobs = [record_to_job(record) for record in _read_records(io.StringIO(MIXED_CSV), "csv")]
+    assert jobs == [
+        ("Chain Rule", "x^2+1", "sin(u)", "x"),
+        ("Quotient Rule", "x", "x+1", "x"),
+        ("Chain Rule", "2t", "u^3", "t"),
+    ]
+
+
+def test_batch_csv(tmp_path):
+    source = tmp_path / "problems.csv"
+    source.write_text(MIXED_CSV)
+    output = tmp_path / "results.jsonl"
+    assert main(["batch", str(source), "-o", str(output), "-j", "1", "--steps", "none"]) == 0
+    records = [json.loads(line) for line in output.read_text().splitlines()]
+    assert [record["id"] for record in records] == ["a", "b", "c"]
+    assert [record.get("error") for record in records] == [None, None, None]
+    assert records[0]["result"] == "2*x*cos(x**2 + 1)"
+    assert records[1]["mode"] == "Quotient Rule"
+    assert records[2]["result"] == "24*t**2"
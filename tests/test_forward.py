@@ -0,0 +1,110 @@
+import numpy as np
+import pytest
+import sympy as sp
+
+from chain_rule.engine import CHAIN_RULE, QUOTIENT_RULE, DerivativeResult, chain_rule_calculator, quotient_rule_calculator
+from chain_rule.forward import compile_dual, cross_check, forward_derivative
+from chain_rule.parser import parse
+
+x, u = sp.symbols("x u")
+POINTS = np.linspace(0.1, 0.9, 17)
+
+CHAIN = [
+    ("x^2+1", "sin(u)"),
+    ("3x-2", "u^5"),
+    ("cos(x)", "exp(u)"),
+    ("x^2", "log(u)+sqrt(u)"),
+    ("sin(x)", "atan(u)*tanh(u)"),
+    ("2^x", "u^3"),
+]
+QUOTIENT = [
+    ("x", "x+1"),
+    ("sin(x)", "x^2+1"),
+    ("exp(x)", "cos(x)+2"),
+    ("log(x+1)", "sqrt(x)"),
+]
+
+
+def expected(expr, at=POINTS):
+    f = sp.lambdify(x, expr, "numpy")
+    return np.broadcast_to(f(at), at.shape)
+
+
+@pytest.mark.parametrize("text", ["x^3*sin(x)", "exp(-x^2)", "x^x", "cot(x)+sec(x)+csc(x)", "asin(x)+acos(x^2)", "7"])
+def test_compile_dual_matches_sympy(text):
+    expr = parse(text)
+    values, derivatives = compile_dual(expr)(POINTS)
+    np.testing.assert_allclose(values, expected(expr), rtol=1e-12)
+    np.testing.assert_allclose(derivatives, expected(sp.diff(expr, x)), rtol=1e-12, atol=1e-14)
+
+
+def test_compile_dual_seeds_and_shapes():
+    evaluate = compile_dual(parse("sin(u)"), "u")
+    values, derivatives = evaluate(np.full((2, 3), 0.5), 2.0)
+    assert values.shape == derivatives.shape == (2, 3)
+    np.testing.assert_allclose(derivatives, 2 * np.cos(0.5))
+
+
+@pytest.mark.parametrize("inner, outer", CHAIN)
+def test_forward_chain_rule(inner, outer):
+    function = parse(outer).subs(u, parse(inner))
+    values, derivatives = forward_derivative(CHAIN_RULE, inner, outer, POINTS)
+    np.testing.assert_allclose(values, expected(function), rtol=1e-12)
+    np.testing.assert_allclose(derivatives, expected(sp.diff(function, x)), rtol=1e-10)
+
+
+@pytest.mark.parametrize("numerator, denominator", QUOTIENT)
+def test_forward_quotient_rule(numerator, denominator):
+    function = parse(numerator) / parse(denominator)
+    values, derivatives = forward_derivative(QUOTIENT_RULE, numerator, denominator, POINTS)
+    np.testing.assert_allclose(values, expected(function), rtol=1e-12)
+    np.testing.assert_allclose(derivatives, expected(sp.diff(function, x)), rtol=1e-10)
+
+
+def test_forward_abs():
+    points = np.linspace(-2, 2, 11)
+    _, derivatives = forward_derivative(CHAIN_RULE, "x^3-x", "abs(u)", points)
+    np.testing.assert_allclose(derivatives, np.sign(points**3 - points) * (3 * points**2 - 1))
+
+
+def test_forward_in_chunks(monkeypatch):
+    from chain_rule import forward
+
+    monkeypatch.setattr(forward, "CHUNK_SIZE", 5)
+    points = np.linspace(-2, 2, 23)
+    _, derivatives = forward_derivative(CHAIN_RULE, "x^2+1", "sin(u)", points)
+    np.testing.assert_allclose(derivatives, 2 * points * np.cos(points**2 + 1), rtol=1e-12)
+
+
+def test_forward_rejects_unknown_symbols_and_modes():
+    with pytest.raises(ValueError, match="unknown symbol"):
+        forward_derivative(CHAIN_RULE, "a*x", "u^2", POINTS)
+    with pytest.raises(ValueError, match="Unknown mode"):
+        forward_derivative("Product Rule", "x", "x", POINTS)
+
+
+@pytest.mark.parametrize("inner, outer", CHAIN[:5])
+def test_cross_check_passes_chain_results(inner, outer):
+    assert cross_check(chain_rule_calculator(inner, outer, "x")).passed is True
+
+
+@pytest.mark.parametrize("numerator, denominator", QUOTIENT)
+def test_cross_check_passes_quotient_results(numerator, denominator):
+    assert cross_check(quotient_rule_calculator(numerator, denominator, "x")).passed is True
+
+
+def test_cross_check_catches_a_wrong_derivative():
+    right = chain_rule_calculator("x^2+1", "sin(u)", "x")
+    # Off by a factor of x^2 / 10^6 -- too small for a loose check to notice.
+    wrong = DerivativeResult(CHAIN_RULE, right.result * (1 + x**2 / 10**6), right.steps, "x", right.function)
+    check = cross_check(wrong)
+    assert check.passed is False
+    assert check.counterexample is not None
+    assert check.max_error > 0
+
+
+def test_cross_check_needs_enough_points():
+    # sqrt of a negative number: only about half the samples are usable.
+    result = chain_rule_calculator("x", "sqrt(u)", "x")
+    assert cross_check(result).passed is True
+    assert cross_check(result, min_points=60).passed is None
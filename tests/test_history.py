@@ -0,0 +1,83 @@
+import pytest
+
+from chain_rule.history import HistoryBuffer
+
+
+@pytest.fixture
+def history(tmp_path):
+    buffer = HistoryBuffer(max_entries=3, spill_path=tmp_path / "spill")
+    yield buffer
+    buffer.close()
+
+
+def fill(history, count):
+    for n in range(count):
+        history.append(f"Result {n}: {n}*x")
+
+
+def test_spills_past_max_entries(history):
+    fill(history, 10)
+    assert len(history) == 10
+    assert history.spilled == 7
+    assert len(history._recent) == 3
+    assert [history[n] for n in range(10)] == [f"Result {n}: {n}*x" for n in range(10)]
+    assert history[-1] == "Result 9: 9*x"
+    with pytest.raises(IndexError):
+        history[10]
+
+
+def test_nothing_spills_below_max_entries(tmp_path):
+    history = HistoryBuffer(max_entries=3, spill_path=tmp_path / "spill")
+    fill(history, 3)
+    assert history.spilled == 0
+    assert not (tmp_path / "spill").exists()
+    assert list(history) == ["Result 0: 0*x", "Result 1: 1*x", "Result 2: 2*x"]
+
+
+@pytest.mark.parametrize("start, count", [
+    (0, 4), (5, 4), (6, 2), (7, 3), (8, 5), (-2, 4), (9, 1), (10, 3), (0, 100),
+])
+def test_window_across_the_spill_boundary(history, start, count):
+    # Entries 0-6 are on disk, 7-9 in memory.
+    fill(history, 10)
+    expected = [f"Result {n}: {n}*x" for n in range(max(0, start), min(10, max(0, start) + count))]
+    assert history.window(start, count) == expected
+
+
+def test_iteration_covers_both_parts(history):
+    fill(history, 8)
+    assert list(history) == [f"Result {n}: {n}*x" for n in range(8)]
+
+
+def test_newlines_and_backslashes_survive_spilling(history):
+    tricky = ["two\nlines", "back\\slash", "literal \\n, not a newline", "trailing\\", "\n\n", ""]
+    for text in tricky:
+        history.append(text)
+    fill(history, 3)
+    assert history.spilled == len(tricky)
+    assert history.window(0, len(tricky)) == tricky
+    assert [history[n] for n in range(len(tricky))] == tricky
+
+
+def test_clear_then_append(history):
+    fill(history, 10)
+    history.clear()
+    assert len(history) == 0
+    assert history.window(0, 5) == []
+    for n in range(5):
+        history.append(f"again {n}")
+    assert history.spilled == 2
+    assert list(history) == [f"again {n}" for n in range(5)]
+
+
+def test_temporary_spill_file():
+    history = HistoryBuffer(max_entries=1)
+    fill(history, 4)
+    assert list(history) == [f"Result {n}: {n}*x" for n in range(4)]
+    history.close()
+    assert len(history) == 0
+
+
+def test_max_entries_must_be_positive():
+    with pytest.raises(ValueError):
+        HistoryBuffer(max_entries=0)
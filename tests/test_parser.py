@@ -0,0 +1,88 @@
+import pytest
+import sympy as sp
+
+from chain_rule.limits import ResourceLimitError
+from chain_rule.parser import ParseError, parse
+
+x, y = sp.symbols("x y")
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("2x", 2 * x),
+    ("3(x+1)", 3 * (x + 1)),
+    ("(x+1)(x-1)", (x + 1) * (x - 1)),
+    ("x sin(x)", x * sp.sin(x)),
+    ("x(x+1)", x * (x + 1)),
+    ("2x^2", 2 * x**2),
+    ("xy", sp.Symbol("xy")),
+    ("x y", x * y),
+    ("2 pi", 2 * sp.pi),
+])
+def test_implicit_multiplication(text, expected):
+    assert parse(text) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("-x^2", -x**2),
+    ("2^-x", 2**-x),
+    ("1/2x", x / 2),
+    ("x^2^3", x**8),
+    ("x**2**3", x**8),
+    ("(x^2)^3", x**6),
+    ("1+2*x^2", 1 + 2 * x**2),
+    ("x-y-1", x - y - 1),
+    ("x/y/2", x / y / 2),
+    ("-(x+1)", -(x + 1)),
+])
+def test_precedence(text, expected):
+    assert parse(text) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("sqrt(x)", sp.sqrt(x)),
+    ("ln(x)", sp.log(x)),
+    ("log(x, 2)", sp.log(x, 2)),
+    ("abs(x)", sp.Abs(x)),
+    ("E^x", sp.exp(x)),
+    ("2.5e-1x", sp.Float("0.25") * x),
+])
+def test_functions_and_constants(text, expected):
+    assert parse(text) == expected
+
+
+@pytest.mark.parametrize("text, position", [
+    ("", 0),
+    ("x +", 3),
+    ("2 3", 2),
+    ("x $ 1", 2),
+    ("(x+1", 4),
+    ("x+1)", 3),
+    ("sin x", 4),
+    ("foo(x)", 0),
+    ("sin(x, 2)", 0),
+    ("x * / 2", 4),
+])
+def test_error_positions(text, position):
+    with pytest.raises(ParseError) as info:
+        parse(text)
+    assert info.value.position == position
+    assert info.value.to_dict() == {"position": position}
+
+
+def test_parse_error_is_a_value_error():
+    # The message counts from 1, for people; `position` from 0.
+    with pytest.raises(ValueError, match="position 4"):
+        parse("x +")
+
+
+def test_exponent_limit():
+    with pytest.raises(ResourceLimitError):
+        parse("9^9^9")
+    # No exponent over the limit, but the number would have 31M bits.
+    with pytest.raises(ResourceLimitError):
+        parse("((9^1000)^1000)^10")
+    with pytest.raises(ResourceLimitError):
+        parse("((2/3)^1000)^1000")
+    assert parse("(9^1000)^10") == sp.Integer(9)**10000
+    # Symbolic bases are left to the input limits, which check the tree.
+    assert parse("(x+1)^1001") == (x + 1)**1001
@@ -0,0 +1,101 @@
+import pytest
+import sympy as sp
+
+from chain_rule import result_cache
+from chain_rule.result_cache import ResultCache
+from chain_rule.steps import Steps
+
+x = sp.Symbol("x")
+
+
+def key(n):
+    return ("Chain Rule", f"first{n}", f"second{n}", "@x", "test")
+
+
+def steps_for(expr):
+    return Steps.of("Result:", ("1. d/dx = ", expr), "", ("   with ^ and _ in the text: ", x**2))
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # A clock that moves one second per reading, so last_used never ties.
+    now = [1000.0]
+
+    def tick():
+        now[0] += 1
+        return now[0]
+
+    monkeypatch.setattr(result_cache.time, "time", tick)
+
+
+def test_put_get_and_steps_round_trip(tmp_path):
+    path = tmp_path / "results.sqlite"
+    expr = sp.cos(x**2) * 2 * x / (1 + sp.exp(x))
+    cache = ResultCache(path)
+    assert cache.get(key(0)) is None
+    cache.put(key(0), expr, steps_for(expr))
+    assert cache.get(key(0)) == (expr, steps_for(expr))
+    cache.close()
+
+    # A fresh instance reads it back from disk, not from the memory layer.
+    reopened = ResultCache(path)
+    result, steps = reopened.get(key(0))
+    assert result == expr
+    assert steps == steps_for(expr)
+    assert steps.text() == steps_for(expr).text()
+    assert len(reopened) == 1
+    reopened.close()
+
+
+def test_keys_are_distinct(tmp_path):
+    cache = ResultCache(tmp_path / "results.sqlite")
+    cache.put(key(0), x, steps_for(x))
+    other_version = key(0)[:-1] + ("other",)
+    assert cache.get(other_version) is None
+    cache.put(key(0), x + 1, steps_for(x + 1))
+    assert cache.get(key(0))[0] == x + 1
+    assert len(cache) == 1
+    cache.close()
+
+
+def test_eviction_past_max_entries(tmp_path, clock):
+    path = tmp_path / "results.sqlite"
+    cache = ResultCache(path, max_entries=10, memory_entries=1)
+    for n in range(10):
+        cache.put(key(n), sp.Integer(n), steps_for(sp.Integer(n)))
+    # Reading through the database bumps key 0 to most recently used.
+    cache.memory.clear()
+    assert cache.get(key(0))[0] == 0
+    cache.put(key(10), sp.Integer(10), steps_for(sp.Integer(10)))
+    # Trimmed to 90% of the cap, least recently used first.
+    assert len(cache) == 9
+    cache.memory.clear()
+    assert cache.get(key(0)) is not None
+    assert cache.get(key(1)) is None
+    assert cache.get(key(2)) is None
+    assert all(cache.get(key(n)) is not None for n in range(3, 11))
+    cache.close()
+
+
+def test_preload(tmp_path, clock):
+    path = tmp_path / "results.sqlite"
+    cache = ResultCache(path)
+    for n in range(5):
+        cache.put(key(n), sp.Integer(n), steps_for(sp.Integer(n)))
+    cache.close()
+
+    warm = ResultCache(path, memory_entries=3, preload=3)
+    # The three most recently used rows are in memory already.
+    assert [warm.memory.get(key(n)) is not None for n in range(5)] == [False, False, True, True, True]
+    assert warm.memory.get(key(4)) == (sp.Integer(4), steps_for(sp.Integer(4)))
+    assert warm.preload(10) == 3
+    warm.close()
+
+
+def test_clear(tmp_path):
+    cache = ResultCache(tmp_path / "results.sqlite")
+    cache.put(key(0), x, steps_for(x))
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.get(key(0)) is None
+    cache.close()
@@ -0,0 +1,65 @@
+import pytest
+import sympy as sp
+
+from chain_rule.engine import chain_rule_calculator, nested_chain_rule_calculator
+from chain_rule.rules import FUNCTION_RULES, differentiate, register_rule
+
+x, u = sp.symbols("x u")
+
+
+def same(a, b):
+    # Equal at a few points in (0, 1), where every rule here is defined.
+    return all(abs(complex((a - b).subs(x, point).evalf())) < 1e-9 for point in (0.1, 0.35, 0.7))
+
+
+@pytest.mark.parametrize("function", [f for f in FUNCTION_RULES if f is not sp.Abs], ids=lambda f: f.__name__)
+def test_function_rules_match_sympy(function):
+    expr = function(x**2 / 2 + sp.Rational(1, 4))
+    assert same(differentiate(expr, x), sp.diff(expr, x))
+
+
+def test_abs_differentiates_to_sign():
+    assert differentiate(sp.Abs(x**2 - 1), x) == 2 * x * sp.sign(x**2 - 1)
+
+
+@pytest.mark.parametrize("expr", [
+    x**3 * sp.sin(x),
+    sp.exp(x) / (x + 1),
+    2**x,
+    x**x,
+    sp.log(sp.cos(x)) + sp.sqrt(x),
+])
+def test_products_powers_and_quotients(expr):
+    assert same(differentiate(expr, x), sp.diff(expr, x))
+
+
+def test_register_rule():
+    class bump(sp.Function):
+        pass
+
+    register_rule(bump, lambda a: 3 * a)
+    try:
+        assert differentiate(bump(x**2), x) == 3 * x**2 * 2 * x
+    finally:
+        del FUNCTION_RULES[bump]
+
+
+def test_memo_is_shared_across_calls():
+    memo = {}
+    first = differentiate(sp.sin(x**2) + x, x, memo)
+    assert memo[(sp.sin(x**2), x)] == 2 * x * sp.cos(x**2)
+    assert differentiate(sp.sin(x**2) * 3, x, memo) == 3 * memo[(sp.sin(x**2), x)]
+    assert first == 2 * x * sp.cos(x**2) + 1
+
+
+def test_memo_keeps_variables_apart():
+    # A memo shared between x and u passes must not hand d/dx to d/du.
+    memo = {}
+    assert differentiate(sp.sin(x), x, memo) == sp.cos(x)
+    assert differentiate(u + sp.sin(x), u, memo) == 1
+
+
+def test_nested_chain_rule_shares_memo_safely():
+    nested = nested_chain_rule_calculator(["sin(x)", "u + sin(x)"], "x")
+    single = chain_rule_calculator("sin(x)", "u + sin(x)", "x")
+    assert nested.result == single.result == sp.cos(x)
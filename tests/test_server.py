@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+
+from chain_rule.server import DerivativeService, _BadRequest, _read_request
+from chain_rule.worker import WorkerOutcome
+
+
+class SlowPool:
+    # Stands in for AsyncWorkerPool: every job takes `seconds`.
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.runs = 0
+
+    async def run(self, job, timeout):
+        self.runs += 1
+        await asyncio.sleep(self.seconds)
+        return WorkerOutcome(self.runs, error=ValueError(f"run {self.runs}"))
+
+
+def test_request_after_last_waiter_left_starts_afresh():
+    async def scenario():
+        service = DerivativeService(workers=1)
+        service.pool = SlowPool(0.2)
+        timed_out = await service.solve({"inner": "x", "outer": "u", "deadline_ms": 20})
+        # Same key, straight after the only waiter gave up on it.
+        answered = await service.solve({"inner": "x", "outer": "u"})
+        return timed_out, answered, service.pool.runs
+
+    timed_out, answered, runs = asyncio.run(scenario())
+    assert timed_out[0] == 504
+    assert answered == (400, {"error": "run 2", "error_type": "ValueError", "coalesced": False})
+    assert runs == 2
+
+
+def test_identical_requests_share_a_computation():
+    async def scenario():
+        service = DerivativeService(workers=1)
+        service.pool = SlowPool(0.05)
+        return await asyncio.gather(*(service.solve({"inner": "x", "outer": "u"}) for _ in range(3))), service
+
+    responses, service = asyncio.run(scenario())
+    assert [body["error"] for _, body in responses] == ["run 1"] * 3
+    assert (service.computed, service.coalesced) == (1, 2)
+
+
+@pytest.mark.parametrize("length", [b"abc", b"-5"])
+def test_invalid_content_length(length):
+    async def scenario():
+        reader = asyncio.StreamReader()
+        reader.feed_data(b"POST /derivative HTTP/1.1\r\nContent-Length: " + length + b"\r\n\r\n{}")
+        reader.feed_eof()
+        return await _read_request(reader)
+
+    with pytest.raises(_BadRequest, match="Invalid Content-Length"):
+        asyncio.run(scenario())
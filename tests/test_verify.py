@@ -0,0 +1,60 @@
+import pytest
+import sympy as sp
+
+from chain_rule.engine import CHAIN_RULE, DerivativeResult, chain_rule_calculator, quotient_rule_calculator
+from chain_rule.verify import verify_derivative, verify_result
+
+x = sp.Symbol("x")
+
+
+@pytest.mark.parametrize("inner, outer", [
+    ("x^2+1", "sin(u)"),
+    ("3x-2", "u^5"),
+    ("cos(x)", "exp(u)"),
+    ("x^2+1", "log(u)"),
+    ("sin(x)", "atan(u)"),
+])
+def test_chain_results_pass(inner, outer):
+    check = chain_rule_calculator(inner, outer, "x").verify()
+    assert check.passed is True
+    assert check.checked >= 8
+    assert check.counterexample is None
+
+
+@pytest.mark.parametrize("numerator, denominator", [
+    ("x", "x+1"),
+    ("sin(x)", "x^2+1"),
+    ("exp(x)", "cos(x)+2"),
+])
+def test_quotient_results_pass(numerator, denominator):
+    assert quotient_rule_calculator(numerator, denominator, "x").verify().passed is True
+
+
+@pytest.mark.parametrize("expr", [x**3 * sp.sin(x), sp.exp(-x**2), sp.tan(x), sp.sqrt(x) * sp.log(x)])
+def test_sympy_derivatives_pass(expr):
+    assert verify_derivative(expr, sp.diff(expr, x)).passed is True
+
+
+@pytest.mark.parametrize("wrong", [
+    2 * x * sp.sin(x**2 + 1),
+    2 * x * sp.cos(x**2 + 1) + sp.Rational(1, 100),
+    x * sp.cos(x**2 + 1),
+])
+def test_wrong_derivative_fails(wrong):
+    right = chain_rule_calculator("x^2+1", "sin(u)", "x")
+    check = verify_result(DerivativeResult(CHAIN_RULE, wrong, right.steps, "x", right.function))
+    assert check.passed is False
+    assert check.counterexample is not None
+
+
+def test_too_few_usable_points():
+    # sqrt of a negative number is skipped, which leaves about half.
+    check = verify_derivative(sp.sqrt(x), 1 / (2 * sp.sqrt(x)), min_points=60)
+    assert check.passed is None
+    assert check.skipped > 0
+
+
+def test_needs_the_original_function():
+    result = chain_rule_calculator("x^2+1", "sin(u)", "x")
+    with pytest.raises(ValueError, match="original function"):
+        verify_result(DerivativeResult(CHAIN_RULE, result.result, result.steps, "x"))